@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+
+### Python Modules ###
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+
+### User Modules ###
+import logparser
+
+# Lines in the layout the switches log in. Interesting ones are filled in from the hosts and users below.
+INTERESTING = ['%(stamp)s %(host)s 1234: %(stamp)s: %%SEC_LOGIN-5-LOGIN_SUCCESS: Login Success [user: %(user)s] [Source: %(source)s] [localport: 22] at %(stamp)s EDT Thu',
+               '%(stamp)s %(host)s 1235: %(stamp)s: %%SEC_LOGIN-4-LOGIN_FAILED: Login failed [user: %(user)s] [Source: %(source)s] [localport: 22] [Reason: Login Authentication Failed] at %(stamp)s EDT Thu',
+               '%(stamp)s %(host)s 1236: %(stamp)s: %%SYS-5-CONFIG_I: Configured from console by %(user)s on vty0 (%(source)s)',
+               '%(stamp)s %(host)s 1237: %(stamp)s: %%PARSER-5-CFGLOG_LOGGEDCMD: User:%(user)s  logged command:interface Gi1/0/1']
+BORING = ['%(stamp)s %(host)s 1238: %(stamp)s: %%LINEPROTO-5-UPDOWN: Line protocol on Interface GigabitEthernet1/0/7, changed state to up',
+          '%(stamp)s %(host)s 1239: %(stamp)s: %%LINK-3-UPDOWN: Interface GigabitEthernet1/0/7, changed state to down',
+          '%(stamp)s %(host)s 1240: %(stamp)s: %%CDP-4-NATIVE_VLAN_MISMATCH: Native VLAN mismatch discovered on GigabitEthernet1/0/48 (1), with b123-sw1 GigabitEthernet0/1 (20).',
+          '%(stamp)s %(host)s 1241: %(stamp)s: %%DOT1X-5-FAIL: Authentication failed for client (0011.2233.4455) on Interface Gi1/0/12']
+
+def make_lines(count, interesting, seed = 0):
+        """
+        Makes count syslog lines, with the given ratio of them interesting.
+        """
+
+        rand = random.Random(seed)
+        lines = []
+
+        for i in range(count):
+                if rand.random() < interesting:
+                        layout = rand.choice(INTERESTING)
+                else:
+                        layout = rand.choice(BORING)
+
+                values = {'stamp': 'Oct 18 %02d:%02d:%02d' % (rand.randrange(24), rand.randrange(60), rand.randrange(60)),
+                          'host': '10.%s.%s.%s' % (rand.randrange(256), rand.randrange(256), rand.randrange(1, 255)),
+                          'user': rand.choice(['admin', 'jsmith', 'netops', 'backup']),
+                          'source': '10.%s.%s.%s' % (rand.randrange(256), rand.randrange(256), rand.randrange(1, 255))}
+
+                lines.append(layout % values + '\n')
+
+        return lines
+
+def old_get_lines(lines, pattern):
+        """
+        What get_lines did before it scanned each line once: re.search for the pattern,
+        then re.findall with every one of the field patterns.
+        """
+
+        p = re.compile(pattern)
+
+        for line in lines:
+                if re.search(p, line):
+                        results = {}
+                        for k, v in logparser.PATTERNS.items():
+                                tmp = re.findall(v, line)
+                                if tmp:
+                                        results[k] = tmp[0]
+                                else:
+                                        results[k] = ''
+                        yield results
+
+def new_get_lines(lines, pattern):
+        """
+        LogParser.get_lines over the given lines instead of a followed file.
+        """
+
+        handle, name = tempfile.mkstemp()
+        os.close(handle)
+
+        try:
+                parser = logparser.LogParser(name)
+        finally:
+                os.remove(name)
+
+        parser.loglines = iter(lines)
+
+        return parser.get_lines(pattern)
+
+def timed(lines, get_lines, pattern):
+        """
+        Runs every line through get_lines. Returns how long it took in seconds and the results.
+        """
+
+        start = time.time()
+        results = list(get_lines(lines, pattern))
+
+        return time.time() - start, results
+
+def main():
+        """
+        Times the old and new get_lines over the same lines, for a few ratios of interesting lines.
+        """
+
+        count = 200000
+        if len(sys.argv) > 1:
+                count = int(sys.argv[1])
+
+        print '%12s %10s %14s %14s %8s' % ('Interesting', 'Lines', 'Old (lines/s)', 'New (lines/s)', 'Speedup')
+
+        for ratio in (0.01, 0.1, 0.5, 1.0):
+                lines = make_lines(count, ratio)
+
+                old_time, old_results = timed(lines, old_get_lines, 'CONFIG|LOGIN')
+                new_time, new_results = timed(lines, new_get_lines, 'CONFIG|LOGIN')
+
+                if old_results != new_results:
+                        print 'Results differ at %s interesting!' % ratio
+                        sys.exit(1)
+
+                print '%12s %10s %14.0f %14.0f %7.1fx' % ('%d%%' % (ratio * 100), count, count / old_time, count / new_time, old_time / new_time)
+
+if __name__ == '__main__':
+        main()
\ No newline at end of file
@@ -1,6 +1,8 @@
 #!/usr/bin/env python
 
 ### Python Modules ###
+import optparse
+import signal
 import socket
 
 ### User Modules ###
@@ -9,6 +11,9 @@ import rotatinglog
 
 LOG_DIR = r'/var/log/cisco_syslog.log'
 OUT_FILE = r'/srv/projects/cisco_reader/syslog.log'
+OFFSET_FILE = r'/srv/projects/cisco_reader/syslog.offset'
+PATTERN = 'CONFIG|LOGIN'
+OUTPUT = '%(time)s - %(user)s - Source: %(source)s - Destination: %(destination)s - %(msg)s'
 
 def make_color(string):
     """
@@ -62,11 +67,53 @@ def ip_to_hostname(res):
 
     return tmp
 
-if __name__ == '__main__':
+def scan(filenames, pattern, jobs = None):
+    """
+    Prints the interesting lines of the given files, oldest first, using jobs processes.
+    With no files, it goes through the syslog and all of its rotated copies.
+    """
+
+    if not filenames:
+        filenames = logparser.history(LOG_DIR)
+
+    for result in logparser.parallel_scan(filenames, pattern, jobs):
+        print make_color(OUTPUT % ip_to_hostname(result))
+
+def stop(signum, frame):
+    """
+    Exits when we're told to stop, so the read position gets saved on the way out.
+    """
+
+    raise SystemExit(0)
+
+def follow(pattern):
+    """
+    Follows the syslog, writing the interesting lines to our own log.
+    """
+
+    signal.signal(signal.SIGTERM, stop)
+
     two_MB = 2097152
-    lp = logparser.LogParser(LOG_DIR)
+    lp = logparser.LogParser(LOG_DIR, OFFSET_FILE)
     rl = rotatinglog.RotatingLogfile(OUT_FILE, two_MB)
 
-    for result in lp.get_lines('CONFIG|LOGIN'):
-        output = '%(time)s - %(user)s - Source: %(source)s - Destination: %(destination)s - %(msg)s' % ip_to_hostname(result)
-        rl.writeline(make_color(output))
\ No newline at end of file
+    try:
+        for result in lp.get_lines(pattern):
+            rl.writeline(make_color(OUTPUT % ip_to_hostname(result)))
+    finally:
+        lp.close()
+
+if __name__ == '__main__':
+    parser = optparse.OptionParser(usage = '%prog [options] [file ...]')
+    parser.add_option('-s', '--scan', action = 'store_true', default = False,
+                      help = 'print the interesting lines of the given files (plain or .gz), or of the syslog and its archives, instead of following the syslog')
+    parser.add_option('-p', '--pattern', default = PATTERN,
+                      help = 'what makes a line interesting [default: %default]')
+    parser.add_option('-j', '--jobs', type = 'int',
+                      help = 'processes to scan with [default: one per core]')
+    options, args = parser.parse_args()
+
+    if options.scan:
+        scan(args, options.pattern, options.jobs)
+    else:
+        follow(options.pattern)
\ No newline at end of file
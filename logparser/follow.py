@@ -0,0 +1,355 @@
+#!/usr/bin/env python
+
+### Python Modules ###
+import os
+import select
+import time
+
+try:
+        import ctypes
+        import ctypes.util
+except ImportError: # Python older than 2.5, polling it is.
+        ctypes = None
+
+### Globals ###
+CHUNK = 65536 # Most bytes read from the file at once.
+POLL = 0.1 # Seconds between looks at the file when inotify isn't there.
+WAKE = 5 # Most seconds to wait on inotify before looking at the file anyway.
+BATCH = 256 # Most lines read before the checkpoint is written out.
+INTERVAL = 5 # Most seconds before the checkpoint is written out.
+GRACE = 2 # Seconds a rotated file must stay quiet before it's let go, unless the new one is written to first.
+
+# From sys/inotify.h
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVE_SELF = 0x00000800
+IN_DELETE_SELF = 0x00000400
+WATCH = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVE_SELF | IN_DELETE_SELF
+
+class InotifyWaiter:
+        """
+        Waits for a file to change using Linux inotify, so nothing runs while the file is quiet.
+        Raises OSError on creation if inotify isn't available.
+        """
+
+        def __init__(self, filename):
+                if not ctypes:
+                        raise OSError('inotify needs ctypes')
+
+                libc = ctypes.CDLL(ctypes.util.find_library('c'))
+
+                try:
+                        self.fd = libc.inotify_init()
+                except AttributeError: # Not Linux.
+                        raise OSError('inotify is not available')
+
+                if self.fd < 0:
+                        raise OSError('inotify_init failed')
+
+                if libc.inotify_add_watch(self.fd, filename, WATCH) < 0:
+                        os.close(self.fd)
+                        raise OSError('Could not watch %s' % filename)
+
+        def wait(self, timeout):
+                """
+                Blocks until the file changes or timeout seconds pass.
+                """
+
+                if select.select([self.fd], [], [], timeout)[0]:
+                        os.read(self.fd, 4096) # What changed doesn't matter, the file gets read either way.
+
+        def close(self):
+                os.close(self.fd)
+
+class PollWaiter:
+        """
+        Waits for a file to change by sleeping a little and letting the file be checked again.
+        """
+
+        def __init__(self, filename):
+                pass
+
+        def wait(self, timeout):
+                time.sleep(POLL)
+
+        def close(self):
+                pass
+
+def make_waiter(filename):
+        """
+        Returns the best waiter this machine has for the file.
+        """
+
+        try:
+                return InotifyWaiter(filename)
+        except OSError:
+                return PollWaiter(filename)
+
+class Checkpoint:
+        """
+        Remembers how far into a file has been read, as its inode and byte offset, so following
+        it can pick up where it left off after a restart. Writes are batched, and go to a
+        temporary file that's renamed over the old one so a crash never leaves half a checkpoint.
+        """
+
+        def __init__(self, filename):
+                """
+                Filename is where the checkpoint is kept.
+                """
+
+                self.filename = filename
+                self.inode = None
+                self.offset = 0
+
+                self._pending = 0
+                self._flushed = time.time()
+
+        def load(self):
+                """
+                Returns the saved (inode, offset), or None if there isn't a usable checkpoint.
+                """
+
+                try:
+                        saved = open(self.filename)
+                        try:
+                                inode, offset = map(int, saved.read().split())
+                        finally:
+                                saved.close()
+                except (IOError, ValueError):
+                        return None
+
+                self.inode = inode
+                self.offset = offset
+
+                return inode, offset
+
+        def update(self, inode, offset):
+                """
+                Records that the file with the given inode has been read up to offset.
+                """
+
+                self.inode = inode
+                self.offset = offset
+                self._pending += 1
+
+                if self._pending >= BATCH or time.time() - self._flushed >= INTERVAL:
+                        self.flush()
+
+        def flush(self):
+                """
+                Writes out the latest position recorded.
+                """
+
+                if self._pending:
+                        temporary = self.filename + '.tmp'
+
+                        out = open(temporary, 'w')
+                        try:
+                                out.write('%s %s\n' % (self.inode, self.offset))
+                        finally:
+                                out.close()
+
+                        os.rename(temporary, self.filename)
+
+                self._pending = 0
+                self._flushed = time.time()
+
+class Follower:
+        """
+        Follows a file as it grows, like tail -F. Sleeps on inotify while nothing is happening
+        and reads whatever has been added in large chunks when something does.
+        Once it has read to the end, it checks whether the file has been rotated (a new file
+        under the name) or truncated. A rotated file is kept open and read until the writer has moved
+        on to the new one, which is then read from its start. A truncated one is read again from its
+        start. Either way nothing is lost or repeated.
+        """
+
+        def __init__(self, filename, checkpoint = None, catch_up = True):
+                """
+                Filename is the file to follow. Following starts from its current end, unless
+                checkpoint is given: the name of a file to keep the position read up to in.
+                Then following resumes from the saved position, reading everything logged since
+                as fast as it can, unless catch_up is False.
+                """
+
+                self.name = filename
+                self.fd = os.open(filename, os.O_RDONLY)
+                self.inode = os.fstat(self.fd).st_ino
+                self.offset = os.lseek(self.fd, 0, 2)
+
+                self.checkpoint = None
+                if checkpoint:
+                        self.checkpoint = Checkpoint(checkpoint)
+                        saved = self.checkpoint.load()
+                        if saved and catch_up:
+                                self._resume(*saved)
+
+                self.waiter = make_waiter(filename)
+
+        ### Private Functions ###
+        def _resume(self, inode, offset):
+                """
+                Moves to offset in the file with the given inode. If the file has been rotated since,
+                the old one is picked up as filename.1 and finished before the new one is started.
+                If the old one can't be found, everything in the new one is new.
+                """
+
+                if self.inode != inode:
+                        try:
+                                fd = os.open(self.name + '.1', os.O_RDONLY)
+                        except OSError:
+                                fd = None
+
+                        if fd is not None and os.fstat(fd).st_ino == inode:
+                                os.close(self.fd)
+                                self.fd = fd # Noticed as rotated once it's been read to the end.
+                                self.inode = inode
+                        else:
+                                if fd is not None:
+                                        os.close(fd)
+                                offset = 0
+
+                self.offset = os.lseek(self.fd, min(offset, os.fstat(self.fd).st_size), 0)
+
+        def _advance(self, length):
+                """
+                Moves the position read up to on by length bytes, and checkpoints it.
+                """
+
+                self._move(self.offset + length)
+
+        def _move(self, offset):
+                """
+                Sets the position read up to, and checkpoints it.
+                """
+
+                self.offset = offset
+
+                if self.checkpoint:
+                        self.checkpoint.update(self.inode, offset)
+
+        def _rotated(self):
+                """
+                True if the name now belongs to a different file than the one being read.
+                A file that's been moved away but not replaced yet isn't rotated until it is.
+                """
+
+                try:
+                        current = os.stat(self.name)
+                except OSError:
+                        return False
+
+                mine = os.fstat(self.fd)
+
+                return (current.st_dev, current.st_ino) != (mine.st_dev, mine.st_ino)
+
+        def _truncated(self):
+                """
+                True if the file is now shorter than what's been read of it.
+                """
+
+                return os.fstat(self.fd).st_size < os.lseek(self.fd, 0, 1)
+
+        def _reopen(self):
+                """
+                Switches to the file now under the name, reading from its start.
+                """
+
+                fd = os.open(self.name, os.O_RDONLY)
+
+                self.waiter.close()
+                os.close(self.fd)
+
+                self.fd = fd
+                self.inode = os.fstat(fd).st_ino
+                self.waiter = make_waiter(self.name)
+
+                self._move(0)
+
+        def _replaced(self):
+                """
+                True if something has been written to the file now under the name.
+                """
+
+                try:
+                        return os.stat(self.name).st_size > 0
+                except OSError:
+                        return False
+
+        def _idle(self, timeout):
+                """
+                Waits up to timeout seconds for the file to be written to.
+                """
+
+                if self.checkpoint: # Caught up, so nothing read gets left unsaved while it's quiet.
+                        self.checkpoint.flush()
+
+                self.waiter.wait(timeout)
+
+        ### Public Functions ###
+        def lines(self):
+                """
+                Yields every line added to the file, newline included. Partial lines are held
+                back until the rest of them is written. Only a rotated file's unfinished last line is
+                yielded as it is, once the writer has gone on to the new file.
+                A line only counts as read once the next one is asked for, so one that was being
+                dealt with when the program stopped is read again after a restart.
+                """
+
+                partial = ''
+                quiet = None # When a rotated file was last found with nothing more in it.
+
+                while True:
+                        data = os.read(self.fd, CHUNK)
+
+                        if data:
+                                quiet = None
+                        elif self._rotated():
+                                # The writer can still have the old file open for a while, so it's only let go
+                                # once it's been quiet for long enough or the new file has been written to.
+                                if quiet is None:
+                                        quiet = time.time()
+
+                                if time.time() - quiet < GRACE and not self._replaced():
+                                        self._idle(POLL)
+                                        continue
+
+                                if partial: # Never finished, and it won't be now.
+                                        yield partial
+                                        self._advance(len(partial))
+                                        partial = ''
+
+                                try:
+                                        self._reopen()
+                                except OSError: # Gone again already, pick it up next time round.
+                                        pass
+
+                                quiet = None
+                                continue
+                        elif self._truncated():
+                                os.lseek(self.fd, 0, 0)
+                                partial = ''
+                                self._move(0)
+                                continue
+                        else:
+                                self._idle(WAKE)
+                                continue
+
+                        lines = (partial + data).split('\n')
+                        partial = lines.pop()
+
+                        for line in lines:
+                                yield line + '\n'
+                                self._advance(len(line) + 1)
+
+        def close(self):
+                """
+                Stops following the file, saving how far it got.
+                """
+
+                if self.checkpoint:
+                        self.checkpoint.flush()
+
+                self.waiter.close()
+                os.close(self.fd)
\ No newline at end of file
@@ -1,8 +1,18 @@
 #!/usr/bin/env python
 
 ### Python Modules ###
+import glob
+import gzip
+import os
 import re
-import time
+
+try:
+        import multiprocessing
+except ImportError: # Python older than 2.6, scans run in this process.
+        multiprocessing = None
+
+### User Modules ###
+import follow
 
 ### Globals ###
 PATTERNS = {'msg': re.compile(r'%(.*?):'),
@@ -11,48 +21,279 @@ PATTERNS = {'msg': re.compile(r'%(.*?):'),
             'source': re.compile(r'(?:Source:|from) (.*?)(?: |\])'),
             'destination': re.compile(r' ((?:\d+\.\d+\.\d+\.\d+)|b.*?)(?: |.eglin.af.mil)')}
 
+# Every pattern above (but time, which is just the start of the line) in one. Each is a lookahead
+# so they can't eat each other's text, and they all start on different characters so only one
+# can match at a time. The first match of each group is the same as searching for it on its own.
+FIELDS = re.compile(r'(?=%(?P<msg>.*?):)'
+                    r'|(?=(?:user:|by) (?P<user>\w+))'
+                    r'|(?=(?:Source:|from) (?P<source>.*?)(?: |\]))'
+                    r'|(?= (?P<destination>(?:\d+\.\d+\.\d+\.\d+)|b.*?)(?: |.eglin.af.mil))')
+FIELD_NAMES = FIELDS.groupindex.keys()
+TIME_LENGTH = 15
+BLOCK = 1048576 # Bytes read from a file at once when scanning it.
+ARCHIVE = 'archive' # Where RotatingLogfile keeps the old logs.
+NUMBERED = re.compile(r'^\.(\d+)(?:\.gz)?$') # What follows the log's name in a rotated copy's: .N or .N.gz.
+SPLIT = 16 * BLOCK # Plain files bigger than this are split into pieces about this size for a parallel scan.
+
+### Private Functions ###
+def _candidates(chunk, finder):
+        """
+        Yields each line in a chunk of whole lines that finder matches somewhere in.
+        Searching the chunk as a whole means the lines that don't match are never split out.
+        """
+
+        pos = 0
+
+        while True:
+                match = finder.search(chunk, pos)
+                if not match:
+                        break
+
+                start = chunk.rfind('\n', 0, match.start()) + 1
+                if start >= len(chunk):
+                        break
+
+                end = chunk.find('\n', match.start()) + 1
+
+                yield chunk[start:end]
+
+                pos = end
+
+def _matches(chunks, pattern):
+        """
+        Yields the results of the lines in chunks of whole lines that match the pattern.
+        """
+
+        p = re.compile(pattern)
+        finder = re.compile(pattern, re.MULTILINE) # So ^ and $ match at each line like they do on their own.
+
+        for chunk in chunks:
+                for results in match_lines(_candidates(chunk, finder), p):
+                        yield results
+
+def _scan_piece(task):
+        """
+        Scans one piece of a file in a worker process. Task is (filename, start, end, pattern).
+        Returns a list of the results, in the order the lines are in.
+        """
+
+        filename, start, end, pattern = task
+
+        return list(_matches(read_chunks(filename, start = start, end = end), pattern))
+
+def _split(filename, size):
+        """
+        Returns a list of (start, end) byte ranges covering a plain file, each about size long
+        and ending at the end of a line.
+        """
+
+        length = os.path.getsize(filename)
+        bounds = [0]
+
+        f = open(filename, 'rb')
+        while bounds[-1] + size < length:
+                f.seek(bounds[-1] + size)
+                f.readline() # On to the start of the next line.
+                bounds.append(f.tell())
+        f.close()
+
+        bounds.append(length)
+
+        return [(start, end) for start, end in zip(bounds, bounds[1:]) if start < end]
+
+### Public Functions ###
+def get_results(string):
+        """
+        Scans a string once for every field to build a dictionary of results,
+        keeping the first match of each. Fields that aren't found are blank.
+        """
+
+        results = {}
+
+        for match in FIELDS.finditer(string):
+                field = match.lastgroup
+                if field not in results:
+                        results[field] = match.group(field)
+                        if len(results) == len(FIELD_NAMES):
+                                break
+
+        for field in FIELD_NAMES:
+                if field not in results:
+                        results[field] = ''
+
+        stamp = string[:TIME_LENGTH]
+        if len(stamp) < TIME_LENGTH or '\n' in stamp:
+                stamp = ''
+        results['time'] = stamp
+
+        return results
+
+def match_lines(lines, p):
+        """
+        Yields the results of each line the compiled pattern p is found in.
+        """
+
+        for line in lines:
+                if p.search(line): # We have an interesting line
+                        yield get_results(line)
+
+def read_chunks(filename, size = BLOCK, start = 0, end = None):
+        """
+        Reads a plain or gzipped file in big chunks, each cut at the end of a line.
+        The last line gets a newline if it's missing one, like every other line.
+        Start and end limit a plain file to the bytes between them.
+        """
+
+        if filename.endswith('.gz'):
+                f = gzip.open(filename, 'rb')
+        else:
+                f = open(filename, 'rb')
+                f.seek(start)
+
+        left = None
+        if end is not None:
+                left = end - start
+
+        partial = ''
+
+        while True:
+                if left is None:
+                        data = f.read(size)
+                else:
+                        data = f.read(min(size, left))
+                        left -= len(data)
+
+                if not data:
+                        break
+
+                end = data.rfind('\n') + 1
+                if not end: # Not a whole line yet.
+                        partial += data
+                        continue
+
+                yield partial + data[:end]
+                partial = data[end:]
+
+        f.close()
+
+        if partial:
+                yield partial + '\n'
+
+def archives(filename):
+        """
+        Returns the rotated copies of a log, oldest first. Finds both the ones RotatingLogfile keeps
+        in archive/name.N.gz and the ones logrotate leaves next to it (name.N or name.N.gz).
+        Their numbers are counted separately, so each set is put in order on its own, highest N
+        (the oldest) first, and the archive ones are taken to be older than logrotate's.
+        """
+
+        names = []
+
+        for prefix in (os.path.join(os.path.dirname(filename), ARCHIVE, os.path.basename(filename)), filename):
+                found = []
+                for name in glob.glob(prefix + '.*'):
+                        number = NUMBERED.match(name[len(prefix):])
+                        if number:
+                                found.append((-int(number.group(1)), name))
+
+                found.sort()
+                names.extend([name for number, name in found])
+
+        return names
+
+def history(filename):
+        """
+        Returns a log's rotated copies and the log itself, oldest first.
+        """
+
+        return archives(filename) + [filename]
+
+def scan(filenames, pattern):
+        """
+        Reads every line of the given files, plain or gzipped, in order and yields the results of
+        the lines that match the pattern, the same as get_lines does for the file it follows.
+        A pattern only ever matches within a line.
+        """
+
+        for filename in filenames:
+                for results in _matches(read_chunks(filename), pattern):
+                        yield results
+
+def plan(filenames, size = SPLIT):
+        """
+        Cuts the files up into pieces to scan in parallel, in the order the files are given.
+        Plain files are split at line ends into pieces about size long, gzipped ones can only be
+        read from the start so they're a piece each. Returns a list of (filename, start, end).
+        """
+
+        pieces = []
+
+        for filename in filenames:
+                if filename.endswith('.gz'):
+                        pieces.append((filename, 0, None))
+                else:
+                        pieces.extend([(filename, start, end) for start, end in _split(filename, size)])
+
+        return pieces
+
+def parallel_scan(filenames, pattern, processes = None, size = SPLIT):
+        """
+        Scan, spread over a pool of processes (one per core unless processes is given).
+        The pieces are handed out in order and their results put back in order, so the results
+        come out the same as scan's, oldest first. Falls back on scan without multiprocessing.
+        """
+
+        if not multiprocessing or processes == 1:
+                for results in scan(filenames, pattern):
+                        yield results
+                return
+
+        tasks = [(filename, start, end, pattern) for filename, start, end in plan(filenames, size)]
+
+        pool = multiprocessing.Pool(processes)
+
+        try:
+                for piece in pool.imap(_scan_piece, tasks):
+                        for results in piece:
+                                yield results
+        except: # Stopped early (GeneratorExit) or something failed, don't leave the workers running.
+                pool.terminate()
+                raise
+
+        pool.close()
+        pool.join()
+
 class LogParser:
         """
         Parses the syslog file for entries we're interested in.
         """
 
-        def __init__(self, filename):
+        def __init__(self, filename, checkpoint = None, catch_up = True):
                 """
-                Filename is the name of the file we want.
+                Filename is the name of the file we want. Checkpoint is the name of a file to
+                remember how far we've read in, so a restart carries on from there. Catch_up
+                says whether to read what was logged while we weren't running.
                 """
 
-                self.loglines = self._follow(open(filename, 'r'))
+                self.follower = None
+                self.loglines = self._follow(filename, checkpoint, catch_up)
 
         ### Private Functions ###
-        def _follow(self, the_file):
+        def _follow(self, filename, checkpoint = None, catch_up = True):
                 """
                 Follows a file and yields a line everytime the file updates.
                 """
 
-                the_file.seek(0, 2)
-                while True:
-                        line = the_file.readline()
-                        if not line:
-                                time.sleep(0.1)
-                                continue
-                        yield line
+                self.follower = follow.Follower(filename, checkpoint, catch_up)
+
+                return self.follower.lines()
 
         def _get_results(self, string):
                 """
-                Runs a dictionary of patterns against a string to build
-                a dictionary of results. Done this way because python 2.4
-                doesn't support dictionary comprehensions.
+                Gets the dictionary of results for a line.
                 """
 
-                results = {}
-                for k, v in PATTERNS.items():
-                        tmp = re.findall(v, string)
-                        if tmp:
-                                results[k] = tmp[0]
-                        else:
-                                results[k] = ''
-
-                return results
+                return get_results(string)
 
         ### Public Functions ###
         def get_lines(self, pattern):
@@ -60,8 +301,12 @@ class LogParser:
                 Creates a generator looking for lines that match the given pattern.
                 """
 
-                p = re.compile(pattern)
+                return match_lines(self.loglines, re.compile(pattern))
+
+        def close(self):
+                """
+                Stops following the file.
+                """
 
-                for line in self.loglines:
-                        if re.search(p, line): # We have an interesting line
-                                yield self._get_results(line)
\ No newline at end of file
+                if self.follower:
+                        self.follower.close()
\ No newline at end of file
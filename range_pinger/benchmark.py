@@ -0,0 +1,164 @@
+### Python Modules ###
+import argparse
+import os
+import re
+import shutil
+import tempfile
+import time
+
+try:
+	import resource
+except ImportError: # Windows
+	resource = None
+
+### User Modules ###
+from source.backend import probe
+from source.backend.rp import RangePing
+from source.backend.simulate import FakeProber, REPLIES
+
+def peak_memory():
+	"""
+	Peak memory of the process so far in MB, or None where it can't be measured.
+	"""
+
+	if not resource:
+		return None
+
+	return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+def timed(func, *args, **kwargs):
+	"""
+	Calls func and returns how long it took in seconds.
+	"""
+
+	start = time.time()
+	func(*args, **kwargs)
+
+	return time.time() - start
+
+def legacy_parse_reply(reply):
+	"""
+	The reply parser from before parse_reply scanned the output once, kept to compare against.
+	Only understands the Windows ping output.
+	"""
+
+	num = int(re.findall('(\d+)% loss', reply)[0])
+
+	sent = re.findall('Sent = (\d+)', reply)
+	received = re.findall('Received = (\d+)', reply)
+	sent = int(sent[0]) if sent else None
+	received = int(received[0]) if received else None
+
+	rtt = [None] * 4
+	times = re.findall('Minimum = (\d+)ms, Maximum = (\d+)ms, Average = (\d+)ms', reply)
+	if times:
+		low, high, avg = map(float, times[0])
+		rtt = [low, avg, high, None]
+
+	val = 'partial'
+	if 'unreachable' in reply:
+		val = 'unreachable'
+	elif num == 0:
+		val = 'yes'
+	elif num == 100:
+		val = 'no'
+
+	return probe.Reply(val, sent, received, *rtt)
+
+def bench_parser(rounds):
+	"""
+	Parses the captured replies rounds times each with both parsers.
+	Returns a list of (name, replies, seconds) for the Windows replies with each parser
+	(all the old one understands), then every reply with the new one.
+	"""
+
+	windows = [reply for name, reply in sorted(REPLIES.items()) if name.startswith('windows')]
+	everything = [reply for name, reply in sorted(REPLIES.items())]
+
+	for reply in windows:
+		assert legacy_parse_reply(reply) == probe.parse_reply(reply)
+
+	def run(parse, replies):
+		for i in xrange(rounds):
+			for reply in replies:
+				parse(reply)
+
+	return [('old, Windows', len(windows) * rounds, timed(run, legacy_parse_reply, windows)),
+	        ('new, Windows', len(windows) * rounds, timed(run, probe.parse_reply, windows)),
+	        ('new, all formats', len(everything) * rounds, timed(run, probe.parse_reply, everything))]
+
+def bench_range(prefix, options):
+	"""
+	Sweeps, saves and loads a single simulated building. Returns a dictionary of measurements.
+	"""
+
+	prober = FakeProber(options.count, options.timeout, options.latency, options.loss, options.dead, options.unreachable)
+	network = '10.0.0.0/%s' % prefix
+	bldg = 'bench%s' % prefix
+
+	results = {'prefix': prefix}
+	results['load'] = timed(RangePing, network, None, bldg)
+
+	target = RangePing(network, None, bldg)
+	results['hosts'] = target.length
+	results['sweep'] = timed(lambda: list(target.ping(workers = options.workers, prober = prober, adaptive = options.adaptive)))
+
+	for i in range(options.sweeps - 1): # Build up some history to load.
+		target.save_results()
+
+	results['save'] = timed(target.save_results)
+	results['history'] = timed(target._get_previous)
+	results['export'] = timed(target.export_results)
+	results['memory'] = peak_memory()
+
+	return results
+
+def main():
+	"""
+	Benchmarks each range size in a temporary directory, so nothing is left behind in resources.
+	"""
+
+	parser = argparse.ArgumentParser(description = "Benchmarks the range pinger against a simulated network.")
+
+	parser.add_argument('--prefixes', type = int, nargs = '+', default = [24, 22, 20, 18, 16], help = "Network sizes to sweep.")
+	parser.add_argument('--workers', type = int, default = 64, help = "Probes running at once.")
+	parser.add_argument('--count', type = int, default = 4, help = "Echoes per probe.")
+	parser.add_argument('--timeout', type = float, default = 0, help = "Milliseconds a lost echo waits.")
+	parser.add_argument('--latency', type = float, default = 0, help = "Milliseconds a reply takes.")
+	parser.add_argument('--loss', type = float, default = 0.0, help = "Ratio of echoes to live hosts that are lost.")
+	parser.add_argument('--dead', type = float, default = 0.5, help = "Ratio of addresses with nothing there.")
+	parser.add_argument('--unreachable', type = float, default = 0.05, help = "Ratio of addresses that come back unreachable.")
+	parser.add_argument('--sweeps', type = int, default = 10, help = "Sweeps saved in the history before timing the loads.")
+	parser.add_argument('--adaptive', action = 'store_true', help = "Use adaptive probing.")
+	parser.add_argument('--parse-rounds', type = int, default = 20000, help = "Times each captured ping reply is parsed.")
+
+	options = parser.parse_args()
+
+	# Smallest first, peak memory only ever goes up.
+	options.prefixes.sort(reverse = True)
+
+	home = os.getcwd()
+	work = tempfile.mkdtemp()
+	os.chdir(work)
+
+	try:
+		print '%6s %8s %10s %12s %9s %9s %9s %9s %10s' % ('Range', 'Hosts', 'Sweep (s)', 'Hosts/s', 'Load (s)', 'Save (s)', 'Hist (s)', 'CSV (s)', 'Peak (MB)')
+
+		for prefix in options.prefixes:
+			r = bench_range(prefix, options)
+			memory = '-' if r['memory'] is None else '%.1f' % r['memory']
+
+			print '%6s %8s %10.3f %12.0f %9.4f %9.4f %9.4f %9.4f %10s' % ('/%s' % prefix, r['hosts'], r['sweep'], r['hosts'] / max(r['sweep'], 0.000001),
+			                                                       r['load'], r['save'], r['history'], r['export'], memory)
+
+		print
+		print '%-18s %10s %10s %12s' % ('Parser', 'Replies', 'Time (s)', 'Replies/s')
+
+		for name, replies, seconds in bench_parser(options.parse_rounds):
+			print '%-18s %10s %10.3f %12.0f' % (name, replies, seconds, replies / max(seconds, 0.000001))
+	finally:
+		os.chdir(home)
+		shutil.rmtree(work)
+
+if __name__ == '__main__':
+	main()
\ No newline at end of file
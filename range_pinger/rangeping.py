@@ -1,4 +1,9 @@
-from source.gui import controller
+import sys
 
 if __name__ == '__main__':
-	controller.run()
\ No newline at end of file
+	if sys.argv[1:]: # Anything on the command line means a headless batch sweep.
+		from source import batch
+		sys.exit(batch.run())
+	else:
+		from source.gui import controller
+		controller.run()
\ No newline at end of file
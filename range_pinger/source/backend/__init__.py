@@ -1 +1,14 @@
-import rp
\ No newline at end of file
+import addresses
+import history
+import hostindex
+import journal
+import metrics
+import neighbors
+import planner
+import probe
+import rangecache
+import report
+import rp
+import scheduler
+import simulate
+import sweep
\ No newline at end of file
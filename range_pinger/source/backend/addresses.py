@@ -0,0 +1,112 @@
+### Python Modules ###
+import socket
+import struct
+
+### Public Functions ###
+def ip_to_int(ip):
+	"""
+	Turns a dotted quad into an integer.
+	"""
+
+	return struct.unpack('!I', socket.inet_aton(ip))[0]
+
+def int_to_ip(number):
+	"""
+	Turns an integer into a dotted quad.
+	"""
+
+	return socket.inet_ntoa(struct.pack('!I', number))
+
+def prefix_to_mask(prefix):
+	"""
+	Turns a prefix length into a subnet mask integer.
+	"""
+
+	return (0xFFFFFFFF << (32 - prefix)) & 0xFFFFFFFF
+
+class AddressRange(object):
+	"""
+	A run of IP addresses stored as integers, like xrange. Nothing is built until it's asked for,
+	so len, indexing and slicing are all O(1) no matter how big the network is.
+	Iterating and indexing give back dotted quad strings.
+	"""
+
+	def __init__(self, start, stop, step = 1):
+		"""
+		Start and stop are integers, stop isn't included. Same as xrange.
+		"""
+
+		if step <= 0:
+			raise ValueError("Step must be positive.")
+
+		self.start = start
+		self.stop = max(start, stop)
+		self.step = step
+
+	@classmethod
+	def from_network(cls, network, prefix):
+		"""
+		Makes the range of host addresses in a network. Skips the net id and broadcast.
+		"""
+
+		return cls(network + 1, network + 2 ** (32 - prefix) - 1)
+
+	### Private Methods ###
+	def _offset(self, index):
+		"""
+		Turns a (possibly negative) index into the integer address. Raises IndexError when out of range.
+		"""
+
+		length = len(self)
+
+		if index < 0:
+			index += length
+
+		if not 0 <= index < length:
+			raise IndexError("Address index out of range.")
+
+		return self.start + index * self.step
+
+	### Public Methods ###
+	def index(self, ip):
+		"""
+		Returns where the given address is in the range. Raises ValueError if it isn't in it.
+		"""
+
+		number = ip_to_int(ip)
+		offset, remainder = divmod(number - self.start, self.step)
+
+		if remainder or not 0 <= offset < len(self):
+			raise ValueError("%s is not in the range." % ip)
+
+		return offset
+
+	def __len__(self):
+		return max(0, (self.stop - self.start + self.step - 1) // self.step)
+
+	def __getitem__(self, index):
+		if isinstance(index, slice):
+			start, stop, step = index.indices(len(self))
+			if step <= 0:
+				raise ValueError("Address ranges can only be sliced forwards.")
+
+			return AddressRange(self.start + start * self.step, self.start + stop * self.step, self.step * step)
+
+		return int_to_ip(self._offset(index))
+
+	def __iter__(self):
+		number = self.start # Not xrange, addresses don't fit in a C long on Windows.
+		while number < self.stop:
+			yield int_to_ip(number)
+			number += self.step
+
+	def __contains__(self, ip):
+		try:
+			self.index(ip)
+		except ValueError:
+			return False
+
+		return True
+
+	def __repr__(self):
+		return 'AddressRange(%s, %s, %s)' % (self.start, self.stop, self.step)
\ No newline at end of file
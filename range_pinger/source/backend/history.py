@@ -0,0 +1,408 @@
+### Python Modules ###
+import collections
+import csv
+import binascii
+import itertools
+import mmap
+import os
+import struct
+import time
+
+### User Modules ###
+import addresses
+
+### Globals ###
+MAGIC = 'RPHS1'
+ARCHIVE_MAGIC = 'RPAR1'
+HEADER = struct.Struct('!5sIBI') # Magic, network, prefix length, number of hosts. Same for the archive.
+STAMP = struct.Struct('!d') # When the sweep was done, in seconds since the epoch.
+STATUSES = ['', 'yes', 'partial', 'no', 'unreachable'] # Index is the code stored for a host. Blank is not pinged.
+CODES = dict((status, code) for code, status in enumerate(STATUSES))
+UP = frozenset([CODES['yes'], CODES['partial']])
+DOWN = frozenset([CODES['no'], CODES['unreachable']])
+DATE_FORMAT = '%a %b %d %H:%M:%S %Y' # What ctime gives, used for the CSV headers.
+
+# Archived codes are packed two hosts to a byte, one hex digit each, so hexlify and unhexlify do the packing.
+TO_HEX = ''.join('%x' % (code & 0xF) for code in range(256))
+FROM_HEX = ''.join(chr(int(digit, 16)) if digit in '0123456789abcdef' else '\0' for digit in map(chr, range(256)))
+
+Changes = collections.namedtuple('Changes', 'up down')
+
+### Public Functions ###
+def pack(codes):
+	"""
+	Packs a sweep's status codes two to a byte.
+	"""
+
+	digits = str(codes).translate(TO_HEX)
+	if len(digits) % 2:
+		digits += '0'
+
+	return binascii.unhexlify(digits)
+
+def unpack(packed, size):
+	"""
+	Unpacks size status codes packed by pack.
+	"""
+
+	return binascii.hexlify(packed)[:size].translate(FROM_HEX)
+
+def remove(filename):
+	"""
+	Deletes a history file along with its archive and date index.
+	"""
+
+	base = os.path.splitext(filename)[0]
+
+	for name in (filename, base + '.arc', base + '.dates', base + '.moving'):
+		if os.path.exists(name):
+			os.remove(name)
+
+def transitions(before, after):
+	"""
+	Compares two sweeps' status codes in one pass.
+	Returns a tuple of the host indexes that came up and the ones that went down.
+	Hosts that weren't pinged in either sweep are left out.
+	"""
+
+	up, down = [], []
+
+	for i, old, new in itertools.izip(itertools.count(), bytearray(before), bytearray(after)):
+		if old in DOWN and new in UP:
+			up.append(i)
+		elif old in UP and new in DOWN:
+			down.append(i)
+
+	return up, down
+
+class HistoryStore(object):
+	"""
+	Append only history of every sweep of a building. After a small header each sweep is
+	one fixed width record: a timestamp followed by one status code byte per host, in address order.
+	Recording a sweep is a single append, and any sweep can be read with one seek.
+	Compacting moves the sweeps into an archive next to the log, where the codes are packed
+	two to a byte with nothing in between, and their timestamps into a separate date index.
+	The archive is memory mapped when it's read, so old sweeps load without any parsing,
+	only unpacking. That's a little slower than reading the log once the files are cached,
+	for half the disk space and reads.
+	The store reads the archive and then the log as one history.
+	"""
+
+	def __init__(self, filename, network, prefix):
+		"""
+		Filename is the history file, network / prefix is the range the building covers.
+		Raises ValueError if the file was started for a different range.
+		"""
+
+		self.filename = filename
+		self.network = network
+		self.prefix = prefix
+		self.hosts = addresses.AddressRange.from_network(network, prefix)
+		self.record = STAMP.size + len(self.hosts)
+		self.packed = (len(self.hosts) + 1) // 2
+		self.archive = os.path.splitext(filename)[0] + '.arc'
+		self.dates = os.path.splitext(filename)[0] + '.dates'
+		self.moving = os.path.splitext(filename)[0] + '.moving'
+
+		if not os.path.exists(filename):
+			self._empty_log() # Losing the log only loses what wasn't compacted yet, the archive stays.
+
+		self._check(filename, MAGIC, "a sweep history")
+
+		if os.path.exists(self.archive):
+			self._check(self.archive, ARCHIVE_MAGIC, "a sweep archive")
+
+		if os.path.exists(self.moving):
+			self._recover()
+
+	### Private Methods ###
+	def _check(self, filename, magic, kind):
+		"""
+		Raises ValueError if the file isn't the given kind or was saved for a different range.
+		"""
+
+		with open(filename, 'rb') as data:
+			their_magic, their_network, their_prefix, count = HEADER.unpack(data.read(HEADER.size))
+
+		if their_magic != magic:
+			raise ValueError("%s is not %s." % (filename, kind))
+
+		if (their_network, their_prefix) != (self.network, self.prefix):
+			raise ValueError("%s was saved for %s/%s. Overwrite it to start over." % (filename, addresses.int_to_ip(their_network), their_prefix))
+
+	def _recover(self):
+		"""
+		Finishes a compaction that was cut short. The marker it left says how many sweeps were
+		archived before it and how many it was moving out of the log. If the date index took them
+		all, the log is emptied as the compaction would have. If it only took some, the date index
+		is cut back so they're all still in the log. Either way no sweep ends up in both or neither.
+		"""
+
+		with open(self.moving) as marker:
+			before, count = map(int, marker.read().split())
+
+		moved = self._archived() - before
+
+		if moved >= count:
+			self._empty_log()
+		elif moved > 0:
+			with open(self.dates, 'r+b') as dates:
+				dates.truncate(before * STAMP.size)
+
+		os.remove(self.moving)
+
+	def _empty_log(self):
+		"""
+		Throws away every sweep in the log, leaving the archive alone.
+		"""
+
+		with open(self.filename, 'wb') as history:
+			history.write(HEADER.pack(MAGIC, self.network, self.prefix, len(self.hosts)))
+
+	def _archived(self):
+		"""
+		How many sweeps are in the archive. The date index is what counts, anything
+		in the archive past it is from a compaction that didn't finish.
+		"""
+
+		if not os.path.exists(self.dates):
+			return 0
+
+		return os.path.getsize(self.dates) // STAMP.size
+
+	def _logged(self):
+		"""
+		How many sweeps are in the log.
+		"""
+
+		return (os.path.getsize(self.filename) - HEADER.size) // self.record
+
+	def _read(self, history, index):
+		"""
+		Reads a single sweep from an open history file. Returns a tuple of the timestamp and status codes.
+		"""
+
+		history.seek(HEADER.size + index * self.record)
+		data = history.read(self.record)
+
+		return STAMP.unpack_from(data)[0], data[STAMP.size:]
+
+	def _read_dates(self):
+		"""
+		Returns a list of the timestamp of every archived sweep.
+		"""
+
+		archived = self._archived()
+		if not archived:
+			return []
+
+		with open(self.dates, 'rb') as dates:
+			data = dates.read(archived * STAMP.size)
+
+		return list(struct.unpack('!%sd' % archived, data))
+
+	### Public Methods ###
+	def clear(self):
+		"""
+		Throws away every sweep, archived ones included.
+		"""
+
+		for filename in (self.archive, self.dates):
+			if os.path.exists(filename):
+				os.remove(filename)
+
+		self._empty_log()
+
+	def compact(self):
+		"""
+		Moves every sweep in the log into the archive and empties the log.
+		Returns how many sweeps were moved.
+		"""
+
+		count = self._logged()
+		if not count:
+			return 0
+
+		archived = self._archived()
+
+		if not os.path.exists(self.archive):
+			with open(self.archive, 'wb') as archive:
+				archive.write(HEADER.pack(ARCHIVE_MAGIC, self.network, self.prefix, len(self.hosts)))
+
+		stamps = []
+		with open(self.filename, 'rb') as history:
+			with open(self.archive, 'r+b') as archive:
+				archive.seek(HEADER.size + archived * self.packed) # Past the last sweep the date index knows about.
+
+				for index in xrange(count):
+					when, codes = self._read(history, index)
+					stamps.append(STAMP.pack(when))
+					archive.write(pack(codes))
+
+				archive.truncate()
+
+		temporary = self.moving + '.tmp'
+		with open(temporary, 'w') as marker: # Written whole before the date index changes, see _recover.
+			marker.write('%s %s\n' % (archived, count))
+		os.rename(temporary, self.moving)
+
+		with open(self.dates, 'r+b' if archived else 'wb') as dates:
+			dates.seek(archived * STAMP.size)
+			dates.write(''.join(stamps))
+			dates.truncate()
+
+		self._empty_log()
+		os.remove(self.moving)
+
+		return count
+
+	def append(self, codes, when = None):
+		"""
+		Records a sweep. Codes is a string of one status code byte per host (see encode).
+		When is a timestamp, defaults to now.
+		"""
+
+		if len(codes) != len(self.hosts):
+			raise ValueError("A sweep needs a result for all %s hosts." % len(self.hosts))
+
+		if when is None:
+			when = time.time()
+
+		with open(self.filename, 'ab') as history:
+			history.write(STAMP.pack(when) + str(codes))
+
+	def encode(self, results):
+		"""
+		Turns a list of [ip, status] results into the status codes for a sweep.
+		Hosts missing from the results are stored as not pinged.
+		"""
+
+		if len(results) == len(self.hosts) and results[0][0] == self.hosts[0] and results[-1][0] == self.hosts[-1]:
+			return bytearray(CODES[status] for ip, status in results) # A full sweep is already in address order.
+
+		codes = bytearray(len(self.hosts))
+		for ip, status in results:
+			codes[self.hosts.index(ip)] = CODES[status]
+
+		return codes
+
+	def diff(self, codes, index = -1):
+		"""
+		Compares a sweep's status codes against a saved sweep, the newest one by default.
+		Only that one sweep is read. Returns Changes of the IPs that came up and went down.
+		"""
+
+		up, down = transitions(self.sweep(index)[1], codes)
+
+		return Changes([self.hosts[i] for i in up], [self.hosts[i] for i in down])
+
+	def sweep(self, index):
+		"""
+		Returns a tuple of the timestamp and status codes of a single sweep.
+		Negative indexes count back from the newest.
+		"""
+
+		count = len(self)
+		if index < 0:
+			index += count
+
+		if not 0 <= index < count:
+			raise IndexError("Sweep index out of range.")
+
+		archived = self._archived()
+		if index < archived:
+			with open(self.dates, 'rb') as dates:
+				dates.seek(index * STAMP.size)
+				when = STAMP.unpack(dates.read(STAMP.size))[0]
+
+			with open(self.archive, 'rb') as archive:
+				archive.seek(HEADER.size + index * self.packed)
+				return when, unpack(archive.read(self.packed), len(self.hosts))
+
+		with open(self.filename, 'rb') as history:
+			return self._read(history, index - archived)
+
+	def timestamps(self):
+		"""
+		Returns a list of when every sweep was done, oldest first, without reading any of their codes.
+		"""
+
+		stamps = self._read_dates()
+
+		with open(self.filename, 'rb') as history:
+			for index in xrange(self._logged()):
+				history.seek(HEADER.size + index * self.record)
+				stamps.append(STAMP.unpack(history.read(STAMP.size))[0])
+
+		return stamps
+
+	def __len__(self):
+		return self._archived() + self._logged()
+
+	def __iter__(self):
+		"""
+		Yields a tuple of the timestamp and status codes for every sweep, oldest first.
+		"""
+
+		stamps = self._read_dates()
+		size = len(self.hosts)
+
+		if stamps:
+			with open(self.archive, 'rb') as archive:
+				data = mmap.mmap(archive.fileno(), 0, access = mmap.ACCESS_READ)
+
+				try:
+					for index, when in enumerate(stamps):
+						yield when, unpack(buffer(data, HEADER.size + index * self.packed, self.packed), size)
+				finally:
+					data.close()
+
+		with open(self.filename, 'rb') as history:
+			for index in xrange(self._logged()):
+				yield self._read(history, index)
+
+	def rows(self):
+		"""
+		Returns the history in the wide layout of the old CSV files.
+		The first row is 'Date' and the date of each sweep, then one row per host of its IP and statuses.
+		"""
+
+		sweeps = list(self)
+
+		table = [['Date'] + [time.ctime(when) for when, codes in sweeps]]
+		for i, ip in enumerate(self.hosts):
+			table.append([ip] + [STATUSES[ord(codes[i])] for when, codes in sweeps])
+
+		return table
+
+	def export_csv(self, filename, delimiter = ','):
+		"""
+		Writes the history out as a wide CSV file.
+		"""
+
+		with open(filename, 'wb') as data:
+			csv.writer(data, delimiter = delimiter).writerows(self.rows())
+
+	def import_csv(self, filename, delimiter = ','):
+		"""
+		Appends every sweep from a wide CSV file written by an older version.
+		Hosts in the CSV that aren't in the range are skipped.
+		"""
+
+		with open(filename, 'rb') as data:
+			table = list(csv.reader(data, delimiter = delimiter))
+
+		if not table:
+			return
+
+		sweeps = [bytearray(len(self.hosts)) for date in table[0][1:]]
+		for row in table[1:]:
+			if row[0] not in self.hosts:
+				continue
+
+			i = self.hosts.index(row[0])
+			for codes, status in zip(sweeps, row[1:]):
+				codes[i] = CODES.get(status, 0)
+
+		for date, codes in zip(table[0][1:], sweeps):
+			self.append(codes, time.mktime(time.strptime(date, DATE_FORMAT)))
\ No newline at end of file
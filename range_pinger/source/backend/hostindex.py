@@ -0,0 +1,192 @@
+### Python Modules ###
+import bisect
+import collections
+import os
+import socket
+import struct
+
+### User Modules ###
+import addresses
+import history
+
+### Globals ###
+MAGIC = 'RPST1'
+HEADER = struct.Struct('!5sIB') # Magic, network, prefix length.
+RECORD = struct.Struct('!IIIB') # Last seen up, last seen down, flaps, status code of the last sweep.
+
+HostState = collections.namedtuple('HostState', 'ip bldg status last_up last_down flaps')
+
+class HostIndex(object):
+	"""
+	Per host state across every building, keyed by IP address. Each building has a state file
+	under resources holding one fixed width record per host, in address order: when it was last
+	seen up and down (seconds since the epoch, 0 for never), how many times it has flapped
+	between up and down, and its status from the last sweep.
+	Lookups find the building from the range database and read just the records they need.
+	"""
+
+	def __init__(self, resource, db):
+		"""
+		Resource is the directory the state files live in, db is the Bldg -> Range database.
+		"""
+
+		self.resource = resource
+		self.db = db
+		self._ranges = None
+
+	### Private Methods ###
+	def _filename(self, bldg):
+		return os.path.join(self.resource, '%s.state' % bldg)
+
+	def _load_ranges(self):
+		"""
+		Sorts every building's range by address, along with how far any range up to that point reaches,
+		so the buildings holding an address can be found with a binary search.
+		"""
+
+		ranges = sorted((network, network + 2 ** (32 - prefix) - 1, bldg) for bldg, (network, prefix) in
+		                ((bldg, self.db[bldg]) for bldg in self.db))
+
+		reach, furthest = [], -1
+		for start, end, bldg in ranges:
+			furthest = max(furthest, end)
+			reach.append(furthest)
+
+		self._ranges = (ranges, [r[0] for r in ranges], reach)
+
+	def _overlapping(self, first, last):
+		"""
+		Yields (network, end, bldg) for every building with an address between first and last.
+		"""
+
+		if self._ranges is None:
+			self._load_ranges()
+
+		ranges, starts, reach = self._ranges
+
+		i = bisect.bisect_right(starts, last) - 1
+		while i >= 0 and reach[i] >= first:
+			if ranges[i][1] >= first:
+				yield ranges[i]
+			i -= 1
+
+	def _read(self, bldg, network, first, last):
+		"""
+		Yields a HostState for every saved host of a building from first to last.
+		"""
+
+		filename = self._filename(bldg)
+		if not os.path.exists(filename):
+			return
+
+		with open(filename, 'rb') as state:
+			header = state.read(HEADER.size)
+			if len(header) < HEADER.size:
+				return
+
+			header = HEADER.unpack(header)
+			if header[0] != MAGIC or header[1] != network: # Saved for a range the building doesn't have any more.
+				return
+
+			hosts = addresses.AddressRange.from_network(network, header[2])
+			start = max(0, first - hosts.start)
+			stop = min(len(hosts), last - hosts.start + 1)
+
+			if start >= stop:
+				return
+
+			state.seek(HEADER.size + start * RECORD.size)
+			data = state.read((stop - start) * RECORD.size)
+
+		for i in xrange(len(data) // RECORD.size):
+			last_up, last_down, flaps, code = RECORD.unpack_from(data, i * RECORD.size)
+			if last_up or last_down or code:
+				yield HostState(hosts[start + i], bldg, history.STATUSES[code], last_up or None, last_down or None, flaps)
+
+	### Public Methods ###
+	def update(self, bldg, network, prefix, codes, when, overwrite = False):
+		"""
+		Folds a building's sweep (status codes in address order, as history stores them) into its state.
+		Overwrite starts the building's state over.
+		"""
+
+		filename = self._filename(bldg)
+		size = len(codes)
+		data = None
+
+		if os.path.exists(filename) and not overwrite:
+			with open(filename, 'rb') as state:
+				data = state.read()
+
+			if len(data) != HEADER.size + size * RECORD.size or HEADER.unpack_from(data) != (MAGIC, network, prefix):
+				data = None # The building's range changed or the file is damaged, start over.
+
+		if data is None:
+			records = bytearray(HEADER.pack(MAGIC, network, prefix) + '\0' * (size * RECORD.size))
+		else:
+			records = bytearray(data)
+
+		when = int(when)
+		for i, code in enumerate(bytearray(codes)):
+			if not code: # Not pinged this time.
+				continue
+
+			offset = HEADER.size + i * RECORD.size
+			last_up, last_down, flaps, previous = RECORD.unpack_from(records, offset)
+
+			if code in history.UP:
+				last_up = when
+				if previous in history.DOWN:
+					flaps += 1
+			else:
+				last_down = when
+				if previous in history.UP:
+					flaps += 1
+
+			RECORD.pack_into(records, offset, last_up, last_down, flaps, code)
+
+		temporary = filename + '.tmp'
+		with open(temporary, 'wb') as state: # Swapped in whole, so a crash can't leave it half written.
+			state.write(records)
+		os.rename(temporary, filename)
+
+	def lookup(self, ip):
+		"""
+		Returns a list of HostState for the IP address, one for each building it's been saved in.
+		Raises ValueError if it isn't an IP address.
+		"""
+
+		try:
+			number = addresses.ip_to_int(ip)
+		except socket.error:
+			raise ValueError("%s is not a valid IP address." % ip)
+
+		found = []
+
+		for network, end, bldg in self._overlapping(number, number):
+			found.extend(self._read(bldg, network, number, number))
+
+		return found
+
+	def lookup_prefix(self, cidr):
+		"""
+		Yields a HostState for every saved host in the network (in CIDR notation), building by building.
+		Raises ValueError if it isn't a network in CIDR notation.
+		"""
+
+		try:
+			net_id, prefix = cidr.split('/')
+			prefix = int(prefix)
+			first = addresses.ip_to_int(net_id)
+		except (ValueError, socket.error):
+			raise ValueError("Please use CIDR notation (xxx.xxx.xxx.xxx/xx) for %s." % cidr)
+
+		if not 0 <= prefix <= 32:
+			raise ValueError("The prefix length has to be between 0 and 32.")
+
+		first &= addresses.prefix_to_mask(prefix)
+		last = first + 2 ** (32 - prefix) - 1
+
+		for network, end, bldg in sorted(self._overlapping(first, last)):
+			for host in self._read(bldg, network, first, last):
+				yield host
\ No newline at end of file
@@ -0,0 +1,90 @@
+### Python Modules ###
+import os
+import struct
+import time
+
+### Globals ###
+MAGIC = 'RPJN1'
+HEADER = struct.Struct('!5sIB') # Magic, network, prefix length.
+ENTRY = struct.Struct('!IB') # Host index, status code (see history.CODES).
+BATCH = 256 # Most results kept in memory before they're written out.
+INTERVAL = 5 # Most seconds results are kept in memory before they're written out.
+
+class Journal(object):
+	"""
+	Checkpoint of a sweep in progress. Every probed host is recorded as its index and status code,
+	written out in batches, so an interrupted sweep can pick up where it left off.
+	"""
+
+	def __init__(self, filename, network, prefix):
+		"""
+		Filename is the journal file, network / prefix is the range being swept.
+		"""
+
+		self.filename = filename
+		self.network = network
+		self.prefix = prefix
+
+		self._pending = []
+		self._flushed = time.time()
+
+	### Public Methods ###
+	def load(self):
+		"""
+		Returns a dictionary of host index -> status code for everything already probed.
+		A journal for a different range is thrown away.
+		"""
+
+		if not os.path.exists(self.filename):
+			return {}
+
+		with open(self.filename, 'rb') as journal:
+			data = journal.read()
+
+		if len(data) < HEADER.size or HEADER.unpack_from(data) != (MAGIC, self.network, self.prefix):
+			self.remove()
+			return {}
+
+		done = {}
+		end = len(data) - (len(data) - HEADER.size) % ENTRY.size # A half written entry from a crash is ignored.
+
+		for offset in xrange(HEADER.size, end, ENTRY.size):
+			index, code = ENTRY.unpack_from(data, offset)
+			done[index] = code
+
+		return done
+
+	def record(self, index, code):
+		"""
+		Records that a host was probed. Written out once enough have built up.
+		"""
+
+		self._pending.append(ENTRY.pack(index, code))
+
+		if len(self._pending) >= BATCH or time.time() - self._flushed >= INTERVAL:
+			self.flush()
+
+	def flush(self):
+		"""
+		Writes out everything recorded so far.
+		"""
+
+		if self._pending:
+			if not os.path.exists(self.filename):
+				self._pending.insert(0, HEADER.pack(MAGIC, self.network, self.prefix))
+
+			with open(self.filename, 'ab') as journal:
+				journal.write(''.join(self._pending))
+
+		self._pending = []
+		self._flushed = time.time()
+
+	def remove(self):
+		"""
+		Throws the journal away, for when the sweep is finished.
+		"""
+
+		self._pending = []
+
+		if os.path.exists(self.filename):
+			os.remove(self.filename)
\ No newline at end of file
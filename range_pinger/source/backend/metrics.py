@@ -0,0 +1,235 @@
+### Python Modules ###
+import array
+import bisect
+import collections
+import os
+import struct
+import sys
+import time
+
+### User Modules ###
+import addresses
+
+### Globals ###
+MAGIC = 'RPRT1'
+HEADER = struct.Struct('!5sIBI') # Magic, network, prefix length, number of hosts.
+STAMP = struct.Struct('!d') # When the sweep was done, in seconds since the epoch.
+SCALE = 10 # Round trip times are kept in tenths of a millisecond.
+NO_REPLY = 0xFFFF # Round trip time of a host that didn't answer. Sorts after every real time.
+NOT_PROBED = 0xFF # Loss of a host that wasn't probed.
+UNKNOWN_LOSS = 0xFE # Loss of a host that was probed but whose reply didn't say how many pings came back.
+RTTS = ('rtt_min', 'rtt_avg', 'rtt_max', 'rtt_std')
+
+Summary = collections.namedtuple('Summary', 'probed answered rtt_avg rtt_median rtt_p95 rtt_max worst loss')
+
+class SweepMetrics(object):
+	"""
+	Round trip times and loss of every host in a sweep, in address order. Each figure is kept
+	in its own array: min, avg, max and standard deviation as unsigned shorts in tenths of
+	a millisecond, and loss as a byte percentage. That's 9 bytes a host, and whole building
+	figures are worked out over the arrays with builtins instead of host by host.
+	"""
+
+	def __init__(self, size):
+		self.size = size
+		self.loss = array.array('B', [NOT_PROBED]) * size
+
+		for name in RTTS:
+			setattr(self, name, array.array('H', [NO_REPLY]) * size)
+
+	### Private Methods ###
+	def _arrays(self):
+		return [getattr(self, name) for name in RTTS] + [self.loss]
+
+	### Public Methods ###
+	def record(self, index, reply):
+		"""
+		Stores a probe.Reply for the host at index.
+		"""
+
+		if reply.sent and reply.received is not None:
+			self.loss[index] = int(round(100.0 * (reply.sent - reply.received) / reply.sent))
+		elif reply.status == 'yes':
+			self.loss[index] = 0
+		elif reply.status == 'partial': # Some pings were lost, there's no telling how many.
+			self.loss[index] = UNKNOWN_LOSS
+		elif reply.status:
+			self.loss[index] = 100
+
+		for name in RTTS:
+			value = getattr(reply, name)
+			if value is not None:
+				getattr(self, name)[index] = min(int(round(value * SCALE)), NO_REPLY - 1)
+
+	def merge(self, other):
+		"""
+		Takes in the hosts another SweepMetrics of the same range has and this one doesn't,
+		for putting the shards of a sweep back together.
+		"""
+
+		for name in RTTS + ('loss',):
+			mine = getattr(self, name)
+			setattr(self, name, array.array(mine.typecode, map(min, mine, getattr(other, name)))) # Missing is the highest value.
+
+	def rtt(self, index):
+		"""
+		Returns a tuple of the min, avg, max and standard deviation (ms) of a host, or None if it didn't answer.
+		"""
+
+		if self.rtt_avg[index] == NO_REPLY:
+			return None
+
+		return tuple(None if getattr(self, name)[index] == NO_REPLY else getattr(self, name)[index] / float(SCALE) for name in RTTS)
+
+	def summary(self):
+		"""
+		Returns a Summary of the whole sweep: how many hosts were probed and answered, the mean, median,
+		95th percentile and worst of their average round trips (ms), the index of the worst host, and
+		the mean loss (percent) of the hosts that answered and whose loss is known. Times are None if
+		nothing answered, and loss is None if no loss is known.
+		"""
+
+		losses = sorted(self.loss)
+		probed = bisect.bisect_left(losses, NOT_PROBED)
+		answering = bisect.bisect_left(losses, 100)
+
+		times = sorted(self.rtt_avg)
+		answered = bisect.bisect_left(times, NO_REPLY)
+
+		loss = sum(losses[:answering]) / float(answering) if answering else None
+
+		if not answered:
+			return Summary(probed, 0, None, None, None, None, None, loss)
+
+		scale = float(SCALE)
+		worst = times[answered - 1]
+
+		return Summary(probed, answered, sum(times[:answered]) / scale / answered, times[answered // 2] / scale,
+		               times[int(answered * 0.95)] / scale, worst / scale, self.rtt_avg.index(worst), loss)
+
+	def tostring(self):
+		"""
+		Packs the metrics into a string, in network byte order.
+		"""
+
+		data = []
+		for values in self._arrays():
+			if sys.byteorder == 'little' and values.itemsize > 1:
+				values = array.array(values.typecode, values)
+				values.byteswap()
+			data.append(values.tostring())
+
+		return ''.join(data)
+
+	@classmethod
+	def fromstring(cls, data, size):
+		"""
+		Unpacks metrics for size hosts packed by tostring.
+		"""
+
+		metrics = cls(0)
+		metrics.size = size
+		offset = 0
+
+		for name in RTTS + ('loss',):
+			values = getattr(metrics, name)
+			end = offset + size * values.itemsize
+			values.fromstring(data[offset:end])
+
+			if sys.byteorder == 'little' and values.itemsize > 1:
+				values.byteswap()
+			offset = end
+
+		return metrics
+
+	@classmethod
+	def packed_size(cls, size):
+		"""
+		Length of the string tostring gives for size hosts.
+		"""
+
+		return size * (2 * len(RTTS) + 1)
+
+class MetricsLog(object):
+	"""
+	Append only log of the metrics of every saved sweep of a building, kept next to its history.
+	After a small header each sweep is a timestamp followed by its packed SweepMetrics.
+	"""
+
+	def __init__(self, filename, network, prefix):
+		"""
+		Filename is the log file, network / prefix is the range the building covers.
+		Raises ValueError if the file was started for a different range.
+		"""
+
+		self.filename = filename
+		self.network = network
+		self.prefix = prefix
+		self.size = len(addresses.AddressRange.from_network(network, prefix))
+		self.record = STAMP.size + SweepMetrics.packed_size(self.size)
+
+		if os.path.exists(filename):
+			with open(filename, 'rb') as log:
+				magic, their_network, their_prefix, count = HEADER.unpack(log.read(HEADER.size))
+
+			if magic != MAGIC:
+				raise ValueError("%s is not a metrics log." % filename)
+
+			if (their_network, their_prefix) != (network, prefix):
+				raise ValueError("%s was saved for %s/%s. Overwrite it to start over." % (filename, addresses.int_to_ip(their_network), their_prefix))
+		else:
+			self.clear()
+
+	### Public Methods ###
+	def clear(self):
+		"""
+		Throws away every sweep.
+		"""
+
+		with open(self.filename, 'wb') as log:
+			log.write(HEADER.pack(MAGIC, self.network, self.prefix, self.size))
+
+	def append(self, metrics, when = None):
+		"""
+		Records a sweep's SweepMetrics. When is a timestamp, defaults to now.
+		"""
+
+		if metrics.size != self.size:
+			raise ValueError("Metrics are needed for all %s hosts." % self.size)
+
+		if when is None:
+			when = time.time()
+
+		with open(self.filename, 'ab') as log:
+			log.write(STAMP.pack(when) + metrics.tostring())
+
+	def sweep(self, index):
+		"""
+		Returns a tuple of the timestamp and SweepMetrics of a single sweep.
+		Negative indexes count back from the newest.
+		"""
+
+		count = len(self)
+		if index < 0:
+			index += count
+
+		if not 0 <= index < count:
+			raise IndexError("Sweep index out of range.")
+
+		with open(self.filename, 'rb') as log:
+			log.seek(HEADER.size + index * self.record)
+			data = log.read(self.record)
+
+		return STAMP.unpack_from(data)[0], SweepMetrics.fromstring(data[STAMP.size:], self.size)
+
+	def __len__(self):
+		return (os.path.getsize(self.filename) - HEADER.size) // self.record
+
+	def __iter__(self):
+		"""
+		Yields a tuple of the timestamp and Summary of every sweep, oldest first.
+		"""
+
+		for index in xrange(len(self)):
+			when, metrics = self.sweep(index)
+			yield when, metrics.summary()
\ No newline at end of file
@@ -0,0 +1,82 @@
+### Python Modules ###
+import os
+import re
+import socket
+import subprocess
+
+### User Modules ###
+import addresses
+
+### Globals ###
+PROC_ARP = '/proc/net/arp'
+COMPLETE = 0x2 # ATF_COM, set on /proc/net/arp entries that have been resolved.
+IP = re.compile(r'(?<![\d.])(\d{1,3}(?:\.\d{1,3}){3})(?![\d.])')
+MAC = re.compile(r'(?<![\da-fA-F])((?:[\da-fA-F]{2}[:-]){5}[\da-fA-F]{2}|(?:[\da-fA-F]{4}\.){2}[\da-fA-F]{4})(?![\da-fA-F])')
+UNUSABLE_MACS = frozenset(['000000000000', 'ffffffffffff'])
+
+### Public Functions ###
+def parse_table(text):
+	"""
+	Pulls the addresses that have a hardware address out of a neighbor table. Understands
+	/proc/net/arp, what arp -a prints on Windows and Linux, and show ip arp exported from a Cisco switch.
+	Incomplete entries, broadcasts and multicasts are left out. Returns a set of IP addresses.
+	"""
+
+	known = set()
+
+	for line in text.splitlines():
+		ip = IP.search(line)
+		mac = MAC.search(line)
+		if not ip or not mac or 'incomplete' in line.lower():
+			continue
+
+		hardware = re.sub('[:.-]', '', mac.group(1)).lower()
+		if hardware in UNUSABLE_MACS or int(hardware[:2], 16) & 1: # Multicast MACs have the low bit of the first octet set.
+			continue
+
+		try:
+			known.add(addresses.int_to_ip(addresses.ip_to_int(ip.group(1))))
+		except socket.error:
+			continue
+
+	return known
+
+def read_proc(filename = PROC_ARP):
+	"""
+	Reads the Linux kernel's neighbor table, keeping only the entries it finished resolving.
+	Returns a set of IP addresses.
+	"""
+
+	lines = []
+
+	with open(filename) as table:
+		for line in table.readlines()[1:]: # First line is the column headers.
+			fields = line.split()
+			if len(fields) >= 3 and int(fields[2], 16) & COMPLETE:
+				lines.append(line)
+
+	return parse_table(''.join(lines))
+
+def read_arp():
+	"""
+	Runs arp -a and returns the set of IP addresses it knows the hardware address of.
+	"""
+
+	command = subprocess.Popen(['arp', '-a'], stdout = subprocess.PIPE, stderr = subprocess.STDOUT)
+
+	return parse_table(command.communicate()[0])
+
+def load(filename = None):
+	"""
+	Returns the set of IP addresses known to be up from a neighbor table exported from
+	a switch (show ip arp) if filename is given, otherwise from this machine's own table.
+	"""
+
+	if filename:
+		with open(filename) as table:
+			return parse_table(table.read())
+
+	if os.path.exists(PROC_ARP):
+		return read_proc()
+
+	return read_arp()
\ No newline at end of file
@@ -0,0 +1,94 @@
+### User Modules ###
+import metrics
+
+### Globals ###
+BLOCK = 16 # Addresses in a row given to the same shard. Roughly what one access switch's hosts are spread over.
+
+class Shard(object):
+	"""
+	One of a range's shards: the host indexes it probes, in the order it probes them.
+	The range is cut into blocks of consecutive addresses which are dealt out round robin, so
+	every shard gets the same share of each part of the range. Each shard starts its walk at
+	a different point of its blocks, so at any moment the shards are probing blocks far apart
+	rather than hammering the same switch side by side.
+	"""
+
+	def __init__(self, size, number, shards, block = BLOCK):
+		"""
+		Size is how many hosts the range has, number is which of the shards this is (from 0).
+		"""
+
+		if not 0 <= number < shards:
+			raise ValueError("Shard %s doesn't exist, there are only %s." % (number, shards))
+
+		self.size = size
+		self.number = number
+		self.shards = shards
+		self.block = block
+
+		blocks = range(number, (size + block - 1) // block, shards)
+		if blocks:
+			turn = number * len(blocks) // shards
+			blocks = blocks[turn:] + blocks[:turn]
+
+		self.blocks = blocks
+
+	@property
+	def spec(self):
+		"""
+		The shard as number/shards, which is all another machine needs to work out the same shard of the range.
+		"""
+
+		return '%s/%s' % (self.number, self.shards)
+
+	def __iter__(self):
+		for start in self.blocks:
+			for index in xrange(start * self.block, min(self.size, (start + 1) * self.block)):
+				yield index
+
+	def __len__(self):
+		return sum(min(self.size, (start + 1) * self.block) - start * self.block for start in self.blocks)
+
+	def __repr__(self):
+		return 'Shard(%s, %s)' % (self.size, self.spec)
+
+### Public Functions ###
+def split(size, shards, block = BLOCK):
+	"""
+	Splits a range of size hosts into shards balanced Shards. They differ by a block at most.
+	"""
+
+	return [Shard(size, number, shards, block) for number in range(shards)]
+
+def parse_spec(size, spec, block = BLOCK):
+	"""
+	Returns the Shard of a range of size hosts given as number/shards.
+	"""
+
+	try:
+		number, shards = map(int, spec.split('/'))
+	except ValueError:
+		raise ValueError("%s is not a shard, use number/shards." % spec)
+
+	return Shard(size, number, shards, block)
+
+def merge(target, parts):
+	"""
+	Puts the sweeps of a range's shards back together on the RangePing target, so it can be
+	saved as one sweep. Parts is a list of (results, metrics) from each shard's sweep.
+	The results end up in address order.
+	"""
+
+	found = []
+	merged = metrics.SweepMetrics(target.length)
+
+	for results, part in parts:
+		found.extend((target.hosts.index(ip), ip, status) for ip, status in results)
+
+		if part:
+			merged.merge(part)
+
+	found.sort()
+
+	target.results = [[ip, status] for index, ip, status in found]
+	target.metrics = merged
\ No newline at end of file
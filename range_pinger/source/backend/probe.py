@@ -0,0 +1,386 @@
+### Python Modules ###
+import collections
+import errno
+import itertools
+import math
+import os
+import re
+import select
+import socket
+import struct
+import subprocess
+import time
+
+### Globals ###
+ECHO_REPLY = 0
+UNREACHABLE = 3
+ECHO_REQUEST = 8
+PAYLOAD = 'rangeping' * 4 # Filler so the echo is a similar size to what ping sends.
+UNREACHABLE_ERRORS = (errno.EHOSTUNREACH, errno.ENETUNREACH)
+IP_RECVERR = getattr(socket, 'IP_RECVERR', 11) # Linux's value, Python 2 doesn't always name it.
+QUICK_TIMEOUT = 500 # Milliseconds to wait on the single echo of an adaptive prober's first try.
+
+# What parse_reply looks for in the Windows, Linux (and BSD) and Cisco IOS ping output. Each starts with
+# a literal so the regex engine can skip straight to it. The times always follow the counts.
+WINDOWS_COUNTS = re.compile(r'Sent = (\d+), Received = (\d+)')
+WINDOWS_TIMES = re.compile(r'Minimum = (\d+)ms, Maximum = (\d+)ms, Average = (\d+)ms')
+CISCO_COUNTS = re.compile(r'Success rate is \d+ percent \((\d+)/(\d+)\)')
+LINUX_COUNTS = re.compile(r'(\d+) packets transmitted, (\d+) (?:packets )?received')
+TIMES = re.compile(r'min/avg/max(?:/(?:mdev|stddev))? = ([\d.]+)/([\d.]+)/([\d.]+)(?:/([\d.]+))?')
+FORMATS = ('windows', 'linux', 'cisco') if os.name == 'nt' else ('linux', 'windows', 'cisco') # The local ping's own first.
+
+_idents = itertools.count(os.getpid() & 0xFFFF) # Raw sockets see every echo reply, so each probe needs its own id.
+
+Reply = collections.namedtuple('Reply', 'status sent received rtt_min rtt_avg rtt_max rtt_std')
+
+### Public Functions ###
+def classify(sent, received, unreachable = False):
+	"""
+	Turns a sent / received count into one of the following:
+	yes - All replies good
+	partial - Some replies
+	no - No replies (They all timed out)
+	unreachable - Destination unreachable
+	"""
+
+	if unreachable:
+		return 'unreachable'
+	elif received >= sent:
+		return 'yes'
+	elif received == 0:
+		return 'no'
+
+	return 'partial'
+
+def parse_arguments(arguments):
+	"""
+	Pulls the count and timeout (in milliseconds) out of a ping argument string.
+	Understands both the Windows (-n / -w ms) and Linux (-c / -W seconds) flags.
+	Returns a tuple of (count, timeout).
+	"""
+
+	count, timeout = 4, 2000
+	args = (arguments or '').split()
+
+	for flag, value in zip(args, args[1:]):
+		if flag in ('-n', '-c'):
+			count = int(value)
+		elif flag == '-w':
+			timeout = int(value)
+		elif flag == '-W':
+			timeout = int(float(value) * 1000)
+
+	return count, timeout
+
+def set_arguments(arguments, count, timeout):
+	"""
+	Returns the ping argument string with its count and timeout (in milliseconds) replaced,
+	keeping whichever style (Windows or Linux) the arguments were written in.
+	"""
+
+	args = (arguments or '').split()
+	linux = '-c' in args or '-W' in args
+	values = {'-n': str(count), '-c': str(count), '-w': str(timeout), '-W': str(max(1, timeout // 1000))}
+
+	for i, flag in enumerate(args[:-1]):
+		if flag in values:
+			args[i + 1] = values[flag]
+
+	for flags in (('-n', '-c'), ('-w', '-W')):
+		if not any(flag in args for flag in flags):
+			flag = flags[linux]
+			args += [flag, values[flag]]
+
+	return ' '.join(args)
+
+def make_command(arguments):
+	"""
+	Takes in any arguments and creates a ping string using them.
+	"""
+
+	if not arguments:
+		arguments = ""
+
+	return ' '.join(["ping"] + arguments.split() + ["%s"])
+
+def parse_reply(reply):
+	"""
+	Takes in the output of the ping command and looks in it for useful information.
+	Understands Windows and Linux ping, and the Cisco IOS style that switches print.
+	Returns a Reply. Counts and round trip times are None when ping didn't print them.
+	"""
+
+	sent = received = counts = None
+	rtt = [None] * 4
+	times = TIMES
+
+	for style in FORMATS: # Each is a single search, so the output is only read once when it's the local ping's.
+		if style == 'linux':
+			stats = reply.find(' packets transmitted')
+			if stats != -1:
+				counts = LINUX_COUNTS.match(reply, reply.rfind('\n', 0, stats) + 1)
+			if counts:
+				sent, received = map(int, counts.groups())
+		elif style == 'windows':
+			counts = WINDOWS_COUNTS.search(reply)
+			if counts:
+				sent, received = map(int, counts.groups())
+				times = WINDOWS_TIMES
+		else:
+			counts = CISCO_COUNTS.search(reply)
+			if counts: # Swapped round.
+				received, sent = map(int, counts.groups())
+
+		if counts:
+			break
+
+	# Unreachable echoes are reported on the lines before the counts, Cisco prints a U for each one.
+	end = counts.start() if counts else len(reply)
+	unreachable = reply.find('nreachable', 0, end) != -1
+	if counts and style == 'cisco':
+		unreachable = unreachable or 'U' in reply[reply.rfind('\n', 0, end - 1):end]
+
+	if counts:
+		found = times.search(reply, counts.end())
+		if found and times is WINDOWS_TIMES:
+			low, high, avg = map(float, found.groups())
+			rtt = [low, avg, high, None]
+		elif found: # Cisco and BusyBox don't print the deviation.
+			rtt = [float(t) if t else None for t in found.groups()]
+
+	if not sent: # Ping gave up without sending anything, the host couldn't be found.
+		return Reply('unreachable' if unreachable else 'no', sent, received, *rtt)
+
+	return Reply(classify(sent, received, unreachable), sent, received, *rtt)
+
+def make_reply(sent, rtts, unreachable = False):
+	"""
+	Builds a Reply out of how many echoes were sent and the round trip times (ms) that came back.
+	"""
+
+	if rtts:
+		avg = sum(rtts) / len(rtts)
+		std = math.sqrt(sum((rtt - avg) ** 2 for rtt in rtts) / len(rtts))
+		rtt = [min(rtts), avg, max(rtts), std]
+	else:
+		rtt = [None] * 4
+
+	return Reply(classify(sent, len(rtts), unreachable), sent, len(rtts), *rtt)
+
+def make_prober(arguments = None):
+	"""
+	Returns the fastest prober allowed on this machine for the given ping arguments.
+	Uses an ICMP socket when possible and falls back to running the ping command.
+	"""
+
+	count, timeout = parse_arguments(arguments)
+
+	try:
+		return IcmpProber(count, timeout)
+	except socket.error:
+		return SubprocessProber(arguments)
+
+### Probers ###
+class SubprocessProber(object):
+	"""
+	Probes an address by running the system's ping command and reading what it prints.
+	"""
+
+	def __init__(self, arguments = None):
+		self.arguments = arguments
+		self.command = make_command(arguments)
+		self.count, self.timeout = parse_arguments(arguments)
+
+	def quick(self, timeout):
+		"""
+		Returns a prober that pings just once and waits timeout milliseconds for the reply.
+		"""
+
+		return SubprocessProber(set_arguments(self.arguments, 1, timeout))
+
+	def probe(self, ip):
+		"""
+		Pings a single IP address and returns a Reply.
+		"""
+
+		command = subprocess.Popen(self.command % ip, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, shell = True)
+
+		return parse_reply(command.communicate()[0])
+
+class IcmpProber(object):
+	"""
+	Probes an address by sending ICMP echoes from inside the process. Uses an
+	unprivileged datagram socket where the OS allows it, otherwise a raw socket.
+	Raises socket.error on creation if neither is permitted.
+	"""
+
+	def __init__(self, count = 4, timeout = 2000):
+		"""
+		Count is how many echoes to send and timeout is how long to wait for each one (in milliseconds).
+		"""
+
+		self.count = count
+		self.timeout = timeout
+		self.kind = socket.SOCK_DGRAM
+
+		try:
+			self._open().close()
+		except socket.error:
+			self.kind = socket.SOCK_RAW
+			self._open().close()
+
+	### Private Methods ###
+	def _open(self):
+		"""
+		Opens a new ICMP socket of the kind this prober uses. A datagram socket never sees the
+		unreachables sent back for it unless IP_RECVERR is on, then they're raised by recvfrom.
+		"""
+
+		sock = socket.socket(socket.AF_INET, self.kind, socket.getprotobyname('icmp'))
+
+		if self.kind == socket.SOCK_DGRAM:
+			try:
+				sock.setsockopt(socket.IPPROTO_IP, IP_RECVERR, 1)
+			except socket.error: # Not Linux, so no unreachables. Those hosts time out instead.
+				pass
+
+		return sock
+
+	def _checksum(self, data):
+		"""
+		The internet checksum of the given string.
+		"""
+
+		if len(data) % 2:
+			data += '\0'
+
+		total = sum(struct.unpack('!%dH' % (len(data) // 2), data))
+		total = (total >> 16) + (total & 0xFFFF)
+		total += total >> 16
+
+		return ~total & 0xFFFF
+
+	def _packet(self, ident, seq):
+		"""
+		Builds an echo request.
+		"""
+
+		header = struct.pack('!BBHHH', ECHO_REQUEST, 0, 0, ident, seq)
+		checksum = self._checksum(header + PAYLOAD)
+
+		return struct.pack('!BBHHH', ECHO_REQUEST, 0, checksum, ident, seq) + PAYLOAD
+
+	def _match(self, data, sender, ip, ident, seq):
+		"""
+		Looks at a received packet and returns its ICMP type if it answers our echo.
+		Returns None for anybody else's traffic, or anything too short to be an answer.
+		"""
+
+		offset = 0
+		if self.kind == socket.SOCK_RAW and data: # Raw sockets hand us the IP header too.
+			offset = (ord(data[0]) & 0x0F) * 4
+
+		if len(data) < offset + 8:
+			return None
+
+		kind, code, checksum, their_ident, their_seq = struct.unpack('!BBHHH', data[offset:offset + 8])
+
+		if kind == ECHO_REPLY and sender == ip and their_seq == seq:
+			if self.kind == socket.SOCK_DGRAM or their_ident == ident: # The kernel rewrites the id on datagram sockets.
+				return kind
+		elif kind == UNREACHABLE and self.kind == socket.SOCK_RAW and len(data) > offset + 8:
+			inner = offset + 8 + (ord(data[offset + 8]) & 0x0F) * 4 # Header of the echo that bounced.
+			if len(data) >= inner + 8 and struct.unpack('!HH', data[inner + 4:inner + 8]) == (ident, seq):
+				return kind
+
+		return None
+
+	### Public Methods ###
+	def quick(self, timeout):
+		"""
+		Returns a prober that sends a single echo and waits timeout milliseconds for the reply.
+		"""
+
+		return IcmpProber(1, timeout)
+
+	def probe(self, ip):
+		"""
+		Sends count echoes to a single IP address and returns a Reply.
+		"""
+
+		ident = next(_idents) & 0xFFFF
+		wait = self.timeout / 1000.0
+		rtts = []
+		unreachable = False
+		sock = self._open()
+
+		try:
+			for seq in range(self.count):
+				sent = time.time()
+				deadline = sent + wait
+
+				try:
+					sock.sendto(self._packet(ident, seq), (ip, 0))
+
+					while True:
+						remaining = deadline - time.time()
+						if remaining <= 0 or not select.select([sock], [], [], remaining)[0]:
+							break
+
+						data, sender = sock.recvfrom(1024)
+						kind = self._match(data, sender[0], ip, ident, seq)
+
+						if kind == ECHO_REPLY:
+							rtts.append((time.time() - sent) * 1000)
+							break
+						elif kind == UNREACHABLE:
+							unreachable = True
+							break
+				except socket.error as e:
+					if e.errno not in UNREACHABLE_ERRORS:
+						raise
+					unreachable = True
+
+				if unreachable:
+					break
+		finally:
+			sock.close()
+
+		return make_reply(self.count, rtts, unreachable)
+
+class AdaptiveProber(object):
+	"""
+	Tries each address with a single short echo first and only gives the ones that answer the full test.
+	An address that doesn't answer gets a second quick try, so one lost echo doesn't mark it down.
+	Dead and unreachable addresses cost a quick timeout or two instead of count full ones.
+	Only probers with a quick(timeout) method can be tried quickly, any other is just used for the full test.
+	"""
+
+	def __init__(self, prober, timeout = QUICK_TIMEOUT):
+		"""
+		Prober does the full test, timeout is the most the quick try waits (in milliseconds).
+		It never waits longer than the prober's own timeout.
+		"""
+
+		self.full = prober
+		self.fast = None
+
+		if hasattr(prober, 'quick'):
+			self.fast = prober.quick(min(timeout, getattr(prober, 'timeout', timeout)))
+
+	def probe(self, ip):
+		"""
+		Probes a single IP address and returns a Reply.
+		"""
+
+		if self.fast is None:
+			return self.full.probe(ip)
+
+		reply = self.fast.probe(ip)
+		if reply.status == 'no':
+			reply = self.fast.probe(ip)
+
+		if reply.status in ('no', 'unreachable'):
+			return reply
+
+		return self.full.probe(ip)
\ No newline at end of file
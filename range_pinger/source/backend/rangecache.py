@@ -0,0 +1,113 @@
+### Python Modules ###
+import os
+import shelve
+import struct
+import whichdb
+
+### User Modules ###
+import addresses
+
+### Globals ###
+MAGIC = 'RPRC1'
+RECORD = struct.Struct('!IBB') # Network, prefix length, length of the name that follows.
+
+class RangeCache(object):
+	"""
+	Bldg -> network lookup kept in a small binary file. Each building is a packed
+	network / prefix pair followed by its name. The whole file is read in one go when opened,
+	after that lookups are a dictionary hit. Saving appends a record, the last record
+	for a building wins.
+	"""
+
+	def __init__(self, filename, legacy = None):
+		"""
+		Filename is the cache file. Legacy is the old shelve database of eval'd xranges.
+		If the cache doesn't exist yet, everything in the legacy database is moved over.
+		"""
+
+		self.filename = filename
+		self.ranges = {}
+
+		if os.path.exists(filename):
+			self._read()
+		else:
+			with open(filename, 'wb') as cache:
+				cache.write(MAGIC)
+
+			if legacy and whichdb.whichdb(legacy):
+				self._migrate(legacy)
+
+	### Private Methods ###
+	def _read(self):
+		"""
+		Loads every record in the cache file. A record cut short by a crash while it was being
+		saved is cut off the file, so the next one saved starts where it should.
+		"""
+
+		with open(self.filename, 'rb') as cache:
+			data = cache.read()
+
+		if not data.startswith(MAGIC):
+			raise ValueError("%s is not a range cache." % self.filename)
+
+		offset = len(MAGIC)
+		while offset + RECORD.size <= len(data):
+			network, prefix, size = RECORD.unpack_from(data, offset)
+			if offset + RECORD.size + size > len(data):
+				break
+
+			offset += RECORD.size
+			self.ranges[data[offset:offset + size]] = (network, prefix)
+			offset += size
+
+		if offset < len(data):
+			with open(self.filename, 'r+b') as cache:
+				cache.truncate(offset)
+
+	def _migrate(self, legacy):
+		"""
+		Converts the per octet xrange strings in the old shelve database into network / prefix pairs.
+		This is the only place that still has to eval them.
+		"""
+
+		db = shelve.open(legacy, 'r')
+
+		try:
+			for bldg in db.keys():
+				octets = eval(db[bldg][0], {"__builtins__": None}, {"xrange": xrange})
+
+				network = addresses.ip_to_int('.'.join(str(o[0]) for o in octets))
+				size = reduce(lambda total, o: total * len(o), octets, 1)
+				prefix = 32 - (size.bit_length() - 1)
+
+				self.save(bldg, network & addresses.prefix_to_mask(prefix), prefix)
+		finally:
+			db.close()
+
+	### Public Methods ###
+	def save(self, bldg, network, prefix):
+		"""
+		Stores the network / prefix for a building, replacing what was there.
+		"""
+
+		if isinstance(bldg, unicode):
+			bldg = bldg.encode('utf-8')
+
+		record = RECORD.pack(network, prefix, len(bldg)) + bldg
+
+		with open(self.filename, 'ab') as cache:
+			cache.write(record)
+
+		self.ranges[bldg] = (network, prefix)
+
+	def __getitem__(self, bldg):
+		return self.ranges[bldg]
+
+	def __contains__(self, bldg):
+		return bldg in self.ranges
+
+	def __iter__(self):
+		return iter(self.ranges)
+
+	def __len__(self):
+		return len(self.ranges)
\ No newline at end of file
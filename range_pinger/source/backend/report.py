@@ -0,0 +1,210 @@
+### Python Modules ###
+import array
+import binascii
+import collections
+import itertools
+import operator
+import sys
+import time
+
+### User Modules ###
+import history
+
+### Globals ###
+LANE = 255 # Most sweeps added up at once before a byte lane could overflow.
+SPILLS = 257 # Most sums of LANE sweeps added up before a 16 bit total could overflow.
+BITS = ''.join(chr((code in history.UP) | bool(code) << 1) for code in range(256)) # Lane of a host: 1 if up, 2 if pinged.
+UP_ONES = ''.join(chr(code in history.UP) for code in range(256)) # Lane of a host: 1 if up.
+
+Day = collections.namedtuple('Day', 'date sweeps up_any up_avg')
+
+### Private Functions ###
+def _lanes(bits):
+	"""
+	Turns a string of BITS into one big integer with a byte lane per host.
+	Whole sweeps can then be added, and'd and xor'd at once.
+	"""
+
+	return int(binascii.hexlify(bits) or '0', 16)
+
+def _unpack(value, size):
+	"""
+	Splits an integer of byte lanes back into a string of size lanes.
+	"""
+
+	return binascii.unhexlify('%0*x' % (size * 2, value))
+
+class _Totals(object):
+	"""
+	Per host totals of sums of up to LANE sweeps, kept as two integers of 16 bit lanes, one for the
+	even hosts and one for the odd ones, so adding a sum is a couple of integer operations.
+	Every SPILLS sums they're moved into an array before a lane can overflow.
+	"""
+
+	def __init__(self, size):
+		self.size = size
+		self.mask = int('00ff' * ((size + 1) // 2), 16) if size else 0 # Every other byte lane.
+		self.totals = array.array('I', [0]) * size
+		self.even = self.odd = 0
+		self.added = 0
+
+	def add(self, value):
+		"""
+		Adds an integer of byte lanes.
+		"""
+
+		if self.size % 2: # Pad to a whole number of pairs, so the even hosts are in the high byte of each.
+			value <<= 8
+
+		self.even += (value >> 8) & self.mask
+		self.odd += value & self.mask
+		self.added += 1
+
+		if self.added == SPILLS:
+			self.flush()
+
+	def flush(self):
+		"""
+		Moves what's been added onto the totals. Returns the totals, an array in address order.
+		"""
+
+		half = (self.size + 1) // 2
+
+		for start, value in ((0, self.even), (1, self.odd)):
+			wide = array.array('H', binascii.unhexlify('%0*x' % (half * 4, value)))
+			if sys.byteorder == 'little':
+				wide.byteswap()
+
+			hosts = slice(start, None, 2)
+			self.totals[hosts] = array.array('I', map(operator.add, self.totals[hosts], wide[:len(self.totals[hosts])]))
+
+		self.even = self.odd = 0
+		self.added = 0
+
+		return self.totals
+
+class HistoryReport(object):
+	"""
+	A building's whole history loaded at once as a matrix of status codes, one row of
+	hosts per sweep, with availability, flapping and per day figures worked out over it.
+	Rather than going host by host, each sweep is turned into one big integer with a lane per host,
+	so a whole sweep is added or compared in a single operation.
+	"""
+
+	def __init__(self, store):
+		"""
+		Store is the building's history.HistoryStore.
+		"""
+
+		self.hosts = store.hosts
+		self.size = len(store.hosts)
+		self.stamps = []
+		self.matrix = []
+
+		for when, codes in store:
+			self.stamps.append(when)
+			self.matrix.append(codes)
+
+		self._counts = None
+		self._days = None
+
+	### Private Methods ###
+	def _count(self):
+		"""
+		Works through the matrix a sweep at a time, counting how many sweeps each host was up and
+		pinged in and how many times it flapped between up and down from one sweep to the next.
+		Returns a tuple of the three arrays of counts, in address order.
+		"""
+
+		if self._counts:
+			return self._counts
+
+		ones = int('01' * self.size, 16) if self.size else 0
+		up_total, pinged_total, flap_total = [_Totals(self.size) for i in range(3)]
+		previous = None
+
+		for start in xrange(0, len(self.matrix), LANE):
+			up_sum = pinged_sum = flap_sum = 0
+
+			for codes in self.matrix[start:start + LANE]:
+				lanes = _lanes(codes.translate(BITS))
+				up = lanes & ones
+				pinged = (lanes >> 1) & ones
+
+				up_sum += up
+				pinged_sum += pinged
+
+				if previous:
+					flap_sum += (up ^ previous[0]) & pinged & previous[1]
+
+				previous = up, pinged
+
+			up_total.add(up_sum)
+			pinged_total.add(pinged_sum)
+			flap_total.add(flap_sum)
+
+		self._counts = up_total.flush(), pinged_total.flush(), flap_total.flush()
+
+		return self._counts
+
+	### Public Methods ###
+	def availability(self):
+		"""
+		Returns an array of the percentage of sweeps each host was up in, out of the sweeps
+		it was pinged in, in address order. Hosts that were never pinged are -1.
+		"""
+
+		up, pinged, flaps = self._count()
+
+		return array.array('f', (100.0 * u / p if p else -1 for u, p in itertools.izip(up, pinged)))
+
+	def overall(self):
+		"""
+		Returns the percentage of every ping in the history that found its host up, or None if there are none.
+		"""
+
+		up, pinged, flaps = self._count()
+		pinged = sum(pinged)
+
+		return 100.0 * sum(up) / pinged if pinged else None
+
+	def flapping(self, least = 1, limit = None):
+		"""
+		Returns a list of (ip, flaps) for the hosts that went between up and down from one sweep
+		to the next at least least times, most first. Limit caps how many are returned.
+		"""
+
+		up, pinged, flaps = self._count()
+		hosts = sorted(((count, i) for i, count in enumerate(flaps) if count >= least), reverse = True)
+
+		return [(self.hosts[i], count) for count, i in hosts[:limit]]
+
+	def daily(self):
+		"""
+		Returns a list of Day, oldest first: the date (YYYY-MM-DD), how many sweeps were done that day,
+		how many hosts were up in at least one of them, and how many were up in each one on average.
+		"""
+
+		if self._days is not None:
+			return self._days
+
+		self._days = []
+
+		def dated(sweep):
+			return time.strftime('%Y-%m-%d', time.localtime(sweep[0]))
+
+		for date, sweeps in itertools.groupby(itertools.izip(self.stamps, self.matrix), dated):
+			bits = [codes.translate(UP_ONES) for when, codes in sweeps]
+			counts = [sweep.count('\1') for sweep in bits]
+
+			if len(bits) == 1:
+				up_any = counts[0]
+			else: # Hosts up in any of the day's sweeps.
+				up_any = _unpack(reduce(operator.or_, map(_lanes, bits)), self.size).count('\1')
+
+			self._days.append(Day(date, len(bits), up_any, sum(counts) / float(len(bits))))
+
+		return self._days
+
+	def __len__(self):
+		return len(self.matrix)
\ No newline at end of file
@@ -1,28 +1,59 @@
 ### Python Modules ###
 import collections
-import csv
-import datetime
-import itertools
-from operator import mul
 import os
-import re
-import shelve
-import subprocess
+import socket
+import time
+
+### User Modules ###
+import addresses
+import history
+import hostindex
+import journal
+import metrics
+import probe
+import rangecache
+import report
+import sweep
+
+### Globals ###
+RESOURCE = 'resources'
+DB_FILE = 'ranges.idx' # Database file for storing Bldg -> Range
+LEGACY_DB_FILE = 'lookup.dat' # Old shelve database, migrated into DB_FILE.
+SUMMARY_IPS = 10 # Most IPs to list for each kind of change in the summary.
+
+### Public Functions ###
+def open_db(resource = RESOURCE):
+	"""
+	Opens the Bldg -> Range database in the given resource directory.
+	"""
+	
+	return rangecache.RangeCache(os.path.join(resource, DB_FILE), legacy = os.path.join(resource, LEGACY_DB_FILE))
+	
+def open_index(resource = RESOURCE):
+	"""
+	Opens the host state index for every building in the given resource directory.
+	"""
+	
+	return hostindex.HostIndex(resource, open_db(resource))
+	
 
 class RangePing(object):
 	"""
 	Creates an IP address range that can be pinged. Stores a bldg -> ip_range database
 	file for grabbing of the IPs instead of constantly regenerating the ranges. By default stores
-	the results of the ping into a CSV using the building's name.
+	the results of the ping in a history file using the building's name, which can be exported to CSV.
 	"""
 	
 	def __init__(self, start = None, subnet = None, bldg = None):
 		self.delimiter = ',' # Delimiter for the CSV file.
-		self.resource = 'resources'
-		self.db_file = os.path.join(self.resource, 'lookup.dat') # Database file for storing Bldg -> Range
+		self.resource = RESOURCE
 		self.net_id = start
 		self.subnet = subnet
 		self.bldg = bldg
+		self.results = []
+		self.metrics = None # Round trip times and loss of the results, a metrics.SweepMetrics.
+		self.changes = None # What changed since the last saved sweep, worked out by diff.
+		self._saved = None # The results that were last saved.
 		
 		self._load_range()
 		
@@ -46,24 +77,15 @@ class RangePing(object):
 	def bldg(self, value):
 		self._bldg = value
 		self._name = os.path.join(self.resource, '%s.csv' % self.bldg)
+		self._history_name = os.path.join(self.resource, '%s.hist' % self.bldg)
+		self._journal_name = os.path.join(self.resource, '%s.journal' % self.bldg)
+		self._metrics_name = os.path.join(self.resource, '%s.rtt' % self.bldg)
 
 	### Private Methods ###
-	def _make_ping(self, args):
-		"""
-		Takes in any args and creates a ping string using them.
-		"""
-		
-		if not args:
-			args = ""
-			
-		command = ' '.join(["ping"] + args.split() + ["%s"])
-		
-		return command
-		
 	def _make_range(self):
 		"""
-		Uses the given net_id / subnet to make the pingable range of IP addresses.
-		NOTE: Includes the NET ID and Broadcast in the range generated. Be aware.
+		Uses the given net_id / subnet to work out the network to ping.
+		Returns a tuple of the network as an integer and its prefix length.
 		Accepts both CIDR notation and the normal IP/Subnet notation.
 		"""
 		
@@ -73,42 +95,28 @@ class RangePing(object):
 		if not self.subnet: # We should be in CIDR notation
 			try:
 				self.net_id, slash = self.net_id.split('/')
+				prefix = int(slash)
 			except ValueError:
 				raise ValueError ("Please use either CIDR notation (xxx.xxx.xxx.xxx/xx) or have an IP and Subnet.")
+		else:
+			try:
+				mask = addresses.ip_to_int(self.subnet)
+			except socket.error:
+				raise ValueError("%s is not a valid subnet mask." % self.subnet)
 				
-			full, part = divmod(int(slash), 8)
-			self.subnet = '.'.join(map(str, [255] * full + [256 - 2 ** (8 - part)] + [0] * (3 - full)))
+			prefix = bin(mask).count('1')
+			if mask != addresses.prefix_to_mask(prefix):
+				raise ValueError("%s is not a valid subnet mask." % self.subnet)
+				
+		if not 0 <= prefix <= 32:
+			raise ValueError("The prefix length has to be between 0 and 32.")
 			
-		seg_ip = map(int, self.net_id.split('.'))
-		subnet_values = [255 ^ int(i) for i in self.subnet.split('.')]
-		variances = [xrange(seg_ip[i], seg_ip[i] + v + 1) for i, v in enumerate(subnet_values)]
-		
-		self.length = reduce(mul, [i + 1 for i in subnet_values]) - 2
-		
-		return variances
-		
-	def _parse_reply(self, reply):
-		"""
-		Takes in a reply returned by subprocess, and looks in it for useful information.
-		Returns the following:
-		yes - All replies good
-		partial - Some replies
-		no - No replies (They all timed out)
-		unreachable - Destination unreachable
-		"""
-		
-		pattern = '(\d+)% loss'
-		num = re.findall(pattern, reply)[0]
-		
-		val = 'partial'
-		if 'unreachable' in reply:
-			val = 'unreachable'
-		elif num == '0':
-			val = 'yes'
-		elif num == '100':
-			val = 'no'
-		
-		return val
+		try:
+			network = addresses.ip_to_int(self.net_id) & addresses.prefix_to_mask(prefix)
+		except socket.error:
+			raise ValueError("%s is not a valid IP address." % self.net_id)
+			
+		return network, prefix
 		
 	def _save_range(self, overwrite = False):
 		"""
@@ -120,46 +128,96 @@ class RangePing(object):
 		
 		if not self.bldg: # We have no name to save to. Fail silently.
 			return False
-
-		db = shelve.open(self.db_file, "w")
-		
-		if self.bldg not in db or overwrite:
-			db[self.bldg] = [str(self.range), str(self.length)]
 			
-		db.close()
-		
+		if self.bldg not in self.db or overwrite:
+			self.db.save(self.bldg, self.network, self.prefix)
+			
 		return True
 			
 	def _load_range(self):
 		"""
 		Loads the range from the database or creates the range from scratch.
 		"""
-
-		db = shelve.open(self.db_file)
-
+		
+		self.db = open_db(self.resource)
+		
 		try:
-			self.range = eval(db[self.bldg][0], {"__builtins__": None}, {"xrange": xrange})
-			self.length = eval(db[self.bldg][1], {"__builtins__": None}, {}) - 2
+			self.network, self.prefix = self.db[self.bldg]
 		except KeyError:
-			self.range = self._make_range()
-		finally:
-			db.close()
+			self.network, self.prefix = self._make_range()
+			
+		self.hosts = addresses.AddressRange.from_network(self.network, self.prefix) # Skips the net id and broadcast
+		self.length = len(self.hosts)
 
 		if self.bldg:
 			self._save_range()
 			
+	def _history(self, overwrite = False):
+		"""
+		Opens the building's sweep history, starting it over (archive and all) if overwrite is true.
+		An empty history picks up the sweeps in the building's old CSV file if there is one.
+		"""
+		
+		if overwrite:
+			history.remove(self._history_name)
+			
+		store = history.HistoryStore(self._history_name, self.network, self.prefix)
+		
+		if not overwrite and not len(store) and os.path.exists(self._name):
+			store.import_csv(self._name, self.delimiter)
+			
+		return store
+		
+	def _metrics_log(self, overwrite = False):
+		"""
+		Opens the log of the building's sweep metrics, starting it over if overwrite is true.
+		"""
+		
+		if overwrite and os.path.exists(self._metrics_name):
+			os.remove(self._metrics_name)
+			
+		return metrics.MetricsLog(self._metrics_name, self.network, self.prefix)
+		
+	def _previous_metrics(self):
+		"""
+		Returns the metrics.Summary of the sweep saved before the results (or the newest
+		sweep if they haven't been saved yet), or None if there isn't one.
+		"""
+		
+		if not self.bldg or not os.path.exists(self._metrics_name):
+			return None
+			
+		log = self._metrics_log()
+		index = -2 if self._saved is self.results else -1
+		
+		if len(log) < -index:
+			return None
+			
+		return log.sweep(index)[1].summary()
+		
+	def _journal(self):
+		"""
+		Opens the checkpoint journal for a sweep of the building. Returns None if there's no building.
+		"""
+		
+		if not self.bldg:
+			return None
+			
+		return journal.Journal(self._journal_name, self.network, self.prefix)
+		
+	def _known(self, neighbors):
+		"""
+		Returns the set of host indexes of the IP addresses in neighbors that are in the range.
+		"""
+		
+		return set(self.hosts.index(ip) for ip in neighbors or () if ip in self.hosts)
+		
 	def _get_previous(self):
 		"""
-		Gets the previous results in the file.
+		Gets the previous results in the CSV layout.
 		"""
 		
-		try:
-			with open(self._name, 'r') as data:
-				reader = csv.reader(data, delimiter = self.delimiter)
-				return [row for row in reader]
-		except IOError as e:
-			self.save_results(overwrite = True)
-			return self._get_previous()
+		return self._history().rows()
 			
 	### Public Methods ###
 	def get_summary(self):
@@ -181,11 +239,63 @@ class RangePing(object):
 				end = 's'
 			results_str += 'There {} {} result{} for "{}".\n'.format(word, v, end, k)
 			
+		changes = self.diff()
+		if changes:
+			for ips, word in zip(changes, ['up', 'down']):
+				end = '' if len(ips) == 1 else 's'
+				results_str += '{} IP{} went {} since the last sweep.'.format(len(ips), end, word)
+				if ips:
+					results_str += ' {}'.format(', '.join(ips[:SUMMARY_IPS]))
+					if len(ips) > SUMMARY_IPS:
+						results_str += ', ...'
+				results_str += '\n'
+				
+		if self.metrics:
+			now = self.metrics.summary()
+			if now.answered:
+				results_str += 'Round trip times were {:.1f} ms on average, {:.1f} ms median, {:.1f} ms 95th percentile and {:.1f} ms at worst ({}).\n'.format(
+				               now.rtt_avg, now.rtt_median, now.rtt_p95, now.rtt_max, self.hosts[now.worst])
+				if now.loss is not None:
+					results_str += 'Hosts that answered lost {:.1f}% of their pings on average.\n'.format(now.loss)
+				
+				before = self._previous_metrics()
+				if before and before.answered:
+					results_str += 'The average round trip went from {:.1f} ms to {:.1f} ms'.format(before.rtt_avg, now.rtt_avg)
+					if before.loss is not None and now.loss is not None:
+						results_str += ' and the average loss from {:.1f}% to {:.1f}%'.format(before.loss, now.loss)
+					results_str += ' since the last sweep.\n'
+			
 		return results_str
+		
+	def diff(self):
+		"""
+		Compares the results against the sweep saved before them (or the newest sweep if they
+		haven't been saved yet). Only that one sweep is read from the history.
+		Returns history.Changes of the IPs that came up and went down, or None if there's nothing to compare to.
+		Must be called after a range has been pinged. Raises an error otherwise.
+		"""
+		
+		if not self.results:
+			raise ValueError("Range has not been pinged yet.")
+			
+		if self._saved is self.results:
+			return self.changes
+			
+		if not self.bldg or not (os.path.exists(self._history_name) or os.path.exists(self._name)):
+			return None
+			
+		store = self._history()
+		
+		self.changes = None
+		if len(store):
+			self.changes = store.diff(store.encode(self.results))
+			
+		return self.changes
 	
 	def save_results(self, overwrite = False):
 		"""
-		Saves the results of the range ping.
+		Saves the results of the range ping by appending them (and their metrics) to the building's
+		history and updating the host state index. The sweep's journal is thrown away, even if it was cancelled.
 		Must be called after a range has been pinged. Raises an error otherwise.
 		Returns true if the range was successfully saved.
 		Returns false otherwise.
@@ -197,42 +307,130 @@ class RangePing(object):
 		if not self.bldg:
 			return False
 			
-		if overwrite:
-			prev_results = [['Date']]
-			for ip in list(itertools.product(*self.range))[1:-1]:
-				prev_results.append(['.'.join(map(str, ip))])
-		else:
-			prev_results = self._get_previous()
+		store = self._history(overwrite)
+		codes = store.encode(self.results)
+		
+		self.changes = None
+		if len(store):
+			self.changes = store.diff(codes)
 			
-		prev_results[0].append(datetime.datetime.now().ctime())
-		for i, r in enumerate(self.results):
-			prev_results[i + 1].append(r[-1])
-
-		with open(self._name, 'w') as tmp:
-			w = csv.writer(tmp, delimiter = self.delimiter)
-			w.writerows(prev_results)
+		when = time.time()
+		store.append(codes, when)
+		self._metrics_log(overwrite).append(self.metrics or metrics.SweepMetrics(self.length), when)
+		hostindex.HostIndex(self.resource, self.db).update(self.bldg, self.network, self.prefix, codes, when, overwrite)
+		self._journal().remove() # A cancelled sweep is saved now, resuming it would save its hosts twice.
+		self._saved = self.results
 			
 		return True
 		
-	def ping(self, arguments=None):
+	def export_results(self, filename = None):
 		"""
-		Takes in any arguments for the ping command and makes a ping string.
-		Pings all the IP addresses in the csv file defined earlier.
+		Writes every saved sweep of the building out as a CSV with a row per IP and a column per sweep.
+		Defaults to the building's CSV file. Returns the name of the file written.
 		"""
 		
-		# Ping command
-		ping = self._make_ping(arguments)
+		if not self.bldg:
+			raise ValueError("Please provide a building to export.")
+			
+		if not filename:
+			filename = self._name
+			
+		self._history().export_csv(filename, self.delimiter)
+		
+		return filename
+		
+	def compact(self):
+		"""
+		Moves the building's saved sweeps into its compressed archive, which is read without any parsing.
+		A building that only has an old CSV file has it brought into the history first.
+		Returns how many sweeps were moved.
+		"""
+		
+		if not self.bldg:
+			raise ValueError("Please provide a building to compact.")
+			
+		return self._history().compact()
+		
+	def report(self):
+		"""
+		Loads the building's whole history into a report.HistoryReport for availability, flapping and per day figures.
+		"""
+		
+		if not self.bldg:
+			raise ValueError("Please provide a building to report on.")
+			
+		return report.HistoryReport(self._history())
+		
+	def ping(self, arguments=None, workers = 1, prober = None, adaptive = False, resume = False, neighbors = None, shard = None):
+		"""
+		Takes in any arguments for the ping command and pings all the IP addresses in the range.
+		Workers is how many pings are allowed to be running at once. The results
+		are still yielded in address order.
+		Prober is anything with a probe(ip) method returning a probe.Reply. By default
+		ICMP is sent straight from a socket, falling back to the ping command if that isn't allowed.
+		Adaptive tries every address once with a short timeout and only fully tests the ones that answer.
+		Round trip times and loss are kept in metrics as the results come in.
+		Progress is checkpointed to a journal under resources. If resume is true, a sweep of the building
+		that was interrupted picks up where it left off, otherwise it's started over.
+		Neighbors is a set of IP addresses already known to be up (see neighbors.load), which
+		are marked up without being probed so only the unknown addresses cost any time.
+		Shard is a planner.Shard to only probe part of the range, in the shard's order. Shards run
+		side by side so they aren't checkpointed. Put them back together with planner.merge.
+		"""
+		
+		if not prober:
+			prober = probe.make_prober(arguments)
+			
+		if adaptive:
+			prober = probe.AdaptiveProber(prober)
+			
 		self.results = []
+		self.metrics = metrics.SweepMetrics(self.length)
 		
-		# Open the CSV file and ping all the IP addresses.
-		for ip in list(itertools.product(*self.range))[1:-1]: # Skips the net id and broadcast
-			ip = '.'.join(map(str, ip))
-			tmp = [ip]
+		checkpoint = None if shard is not None else self._journal()
+		done = {}
+		
+		if checkpoint and resume:
+			done = checkpoint.load()
+		elif checkpoint:
+			checkpoint.remove()
+			
+		known = self._known(neighbors)
+		
+		def check(i):
+			ip = self.hosts[i]
+			if i in done:
+				return i, ip, history.STATUSES[done[i]], None
+			elif i in known:
+				return i, ip, 'yes', None
 				
-			command = subprocess.Popen(ping % ip, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, shell = True)
-			res = self._parse_reply(command.communicate()[0])
+			reply = prober.probe(ip)
+			return i, ip, reply.status, reply
+			
+		start = 0
+		while start in done: # Everything up to the first address that wasn't probed comes straight from the journal.
+			yield history.STATUSES[done[start]]
+			
+			self.results.append([self.hosts[start], history.STATUSES[done[start]]])
+			start += 1
+			
+		finished = False
+		
+		try:
+			for i, ip, res, reply in sweep.ordered_map(check, shard if shard is not None else xrange(start, self.length), workers):
+				if reply:
+					self.metrics.record(i, reply)
+					
+				if checkpoint and i not in done:
+					checkpoint.record(i, history.CODES[res])
+					
+				yield res
 				
-			yield res
+				self.results.append([ip, res])
 				
-			tmp.append(res) # Passes in the reply of the communicate method
-			self.results.append(tmp)
\ No newline at end of file
+			finished = True
+		finally:
+			if checkpoint and finished:
+				checkpoint.remove()
+			elif checkpoint:
+				checkpoint.flush()
\ No newline at end of file
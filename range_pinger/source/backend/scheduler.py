@@ -0,0 +1,324 @@
+### Python Modules ###
+import collections
+from multiprocessing.pool import ThreadPool
+import Queue
+import threading
+import time
+
+### User Modules ###
+import history
+import metrics
+import probe
+
+Result = collections.namedtuple('Result', 'target ip status')
+
+class TokenBucket(object):
+	"""
+	Rate limiter handing out rate tokens a second, saving up at most burst of them.
+	"""
+
+	def __init__(self, rate, burst = None):
+		self.rate = float(rate)
+		self.burst = burst or max(1, int(rate))
+		self.tokens = float(self.burst)
+		self.stamp = time.time()
+
+	def take(self):
+		"""
+		Takes a token if there is one.
+		Returns 0 if it was taken, otherwise how many seconds until the next one is available.
+		"""
+
+		now = time.time()
+		self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+		self.stamp = now
+
+		if self.tokens >= 1:
+			self.tokens -= 1
+			return 0
+
+		return (1 - self.tokens) / self.rate
+
+class _Job(object):
+	"""
+	Book keeping for one RangePing being swept by the scheduler.
+	"""
+
+	def __init__(self, target, prober, bucket, checkpoint):
+		self.target = target
+		self.prober = prober
+		self.bucket = bucket
+		self.checkpoint = checkpoint
+		self.ips = target.hosts
+		self.statuses = [None] * len(self.ips)
+		self.next = 0
+		self.left = len(self.ips)
+
+class SweepScheduler(object):
+	"""
+	Sweeps any number of ranges at once. A single dispatcher thread hands addresses out
+	round robin between the ranges, never letting more than in_flight probes run at a time
+	and holding each range to its own rate limit. Results are put on a thread safe queue
+	in the order they finish, so a GUI can drain it with get(False) from a timer, and can also
+	be handed to a callback. Sweeps can be paused, resumed and cancelled.
+	Once a range is done (or cancelled) its results are stored on it in address order so
+	save_results works. A cancelled range only has results for the addresses that were probed.
+	"""
+
+	def __init__(self, in_flight = 64, callback = None):
+		"""
+		In_flight is the most probes running at once. Callback is called with every Result
+		as it finishes. It runs on a worker thread, so a GUI shouldn't touch its widgets from it.
+		"""
+
+		self.in_flight = in_flight
+		self.callback = callback
+		self.jobs = []
+		self.left = 0
+		self.cancelled = False
+
+		self._results = Queue.Queue()
+		self._slots = threading.BoundedSemaphore(in_flight)
+		self._lock = threading.Lock()
+		self._running = threading.Event()
+		self._running.set()
+		self._pool = None
+
+	### Private Methods ###
+	def _dispatch(self):
+		"""
+		Hands out addresses to the worker threads until every range has been sent.
+		"""
+
+		waiting = [job for job in self.jobs if job.ips]
+
+		while waiting:
+			delay = None
+
+			for job in waiting:
+				self._running.wait()
+				if self.cancelled:
+					break
+
+				while job.next < len(job.ips) and job.statuses[job.next]: # Restored from the journal.
+					job.next += 1
+
+				if job.next >= len(job.ips):
+					continue
+
+				if job.bucket:
+					wait = job.bucket.take()
+					if wait:
+						delay = min(delay or wait, wait)
+						continue
+
+				self._slots.acquire()
+				if self.cancelled: # Cancelled while waiting for a slot.
+					self._slots.release()
+					break
+
+				self._pool.apply_async(self._probe, (job, job.next))
+				job.next += 1
+
+			waiting = [job for job in waiting if job.next < len(job.ips)]
+
+			if self.cancelled:
+				break
+
+			if delay and waiting:
+				time.sleep(delay)
+
+		for job in waiting: # Only left over when cancelled. Stop waiting on what will never be probed.
+			skipped = len(job.ips) - job.next
+			self._finished(job, skipped)
+
+			with self._lock:
+				self.left -= skipped
+
+	def _finished(self, job, count):
+		"""
+		Marks count addresses of a job as finished. Stores the results on its range once they all are.
+		"""
+
+		with self._lock:
+			job.left -= count
+			if not job.left:
+				job.target.results = [[ip, status] for ip, status in zip(job.ips, job.statuses) if status]
+
+				if job.checkpoint and len(job.target.results) == len(job.ips):
+					job.checkpoint.remove()
+				elif job.checkpoint: # Cancelled or something went wrong, keep it to pick back up.
+					job.checkpoint.flush()
+
+	def _put(self, result):
+		"""
+		Hands a Result (or the error a prober raised) to the callback and the queue.
+		"""
+
+		if self.callback and not isinstance(result, Exception):
+			self.callback(result)
+
+		self._results.put(result)
+
+	def _probe(self, job, index):
+		"""
+		Probes a single address of a job. Runs on a worker thread.
+		The range's results are filled in before its last Result is queued.
+		"""
+
+		try:
+			reply = job.prober.probe(job.ips[index])
+			job.target.metrics.record(index, reply)
+			status = reply.status
+			result = Result(job.target, job.ips[index], status)
+		except Exception as e: # Hand it to whoever is reading the results instead of losing it in the pool.
+			status = None
+			result = e
+
+		self._slots.release()
+
+		with self._lock:
+			job.statuses[index] = status
+			if job.checkpoint and status:
+				job.checkpoint.record(index, history.CODES[status])
+		self._finished(job, 1)
+		self._put(result)
+
+	### Public Methods ###
+	def add(self, target, arguments = None, rate = None, burst = None, prober = None, adaptive = False, resume = False, neighbors = None):
+		"""
+		Adds a RangePing to be swept with the given ping arguments.
+		Rate limits it to rate probes a second (with bursts up to burst) if given.
+		Prober, adaptive, resume and neighbors work the same as for RangePing.ping. Results picked
+		up from the journal and hosts already known to be up are handed out straight away, to the callback
+		as well as by get.
+		"""
+
+		if self._pool:
+			raise ValueError("Sweep has already started.")
+
+		if not prober:
+			prober = probe.make_prober(arguments)
+
+		if adaptive:
+			prober = probe.AdaptiveProber(prober)
+
+		bucket = None
+		if rate:
+			bucket = TokenBucket(rate, burst)
+
+		job = _Job(target, prober, bucket, target._journal())
+		target.results = []
+		target.metrics = metrics.SweepMetrics(len(job.ips))
+
+		self.jobs.append(job)
+		self.left += len(job.ips)
+
+		if job.checkpoint and not resume:
+			job.checkpoint.remove()
+		elif job.checkpoint:
+			done = job.checkpoint.load()
+
+			for index, code in done.iteritems():
+				job.statuses[index] = history.STATUSES[code]
+				self._put(Result(target, job.ips[index], job.statuses[index]))
+
+			self._finished(job, len(done))
+
+		known = [index for index in target._known(neighbors) if not job.statuses[index]]
+		for index in known:
+			job.statuses[index] = 'yes'
+			if job.checkpoint:
+				job.checkpoint.record(index, history.CODES['yes'])
+			self._put(Result(target, job.ips[index], 'yes'))
+
+		if known:
+			self._finished(job, len(known))
+
+	def start(self):
+		"""
+		Starts sweeping in the background and returns straight away.
+		"""
+
+		self._pool = ThreadPool(self.in_flight)
+
+		dispatcher = threading.Thread(target = self._dispatch)
+		dispatcher.daemon = True
+		dispatcher.start()
+
+	def get(self, block = True, timeout = None):
+		"""
+		Returns the next Result. Raises Queue.Empty if there isn't one and block is false
+		(or the timeout ran out), just like Queue.get. Errors raised by a prober are raised here.
+		"""
+
+		result = self._results.get(block, timeout)
+
+		with self._lock:
+			self.left -= 1
+
+		if isinstance(result, Exception):
+			raise result
+
+		return result
+
+	def pause(self):
+		"""
+		Stops handing out addresses. Probes already running still finish.
+		"""
+
+		self._running.clear()
+
+	def resume(self):
+		"""
+		Picks a paused sweep back up.
+		"""
+
+		self._running.set()
+
+	@property
+	def paused(self):
+		return not self._running.is_set()
+
+	def cancel(self):
+		"""
+		Stops the sweep. Probes already running still finish and are handed out by get,
+		after that the sweep is done and each range has the results it got.
+		"""
+
+		self.cancelled = True
+		self._running.set()
+
+	@property
+	def done(self):
+		"""
+		True once every Result has been handed out by get.
+		"""
+
+		return self.left <= 0
+
+	def close(self):
+		"""
+		Stops the sweep and the worker threads. A dispatcher waiting for a free slot or on a pause
+		is let go first, so it sees the sweep is cancelled and stops too.
+		"""
+
+		self.cancel()
+
+		try:
+			self._slots.release()
+		except ValueError: # Every slot was free, so it wasn't waiting on one.
+			pass
+
+		if self._pool:
+			self._pool.terminate()
+
+	def __iter__(self):
+		if not self._pool:
+			self.start()
+
+		try:
+			while not self.done:
+				yield self.get()
+		finally:
+			self.close()
\ No newline at end of file
@@ -0,0 +1,168 @@
+### Python Modules ###
+import random
+import time
+
+### User Modules ###
+import probe
+
+### Globals ###
+# Output captured from the ping commands parse_reply understands, for benchmarking it.
+REPLIES = {
+	'windows_yes': """
+Pinging 10.20.1.15 with 32 bytes of data:
+Reply from 10.20.1.15: bytes=32 time=1ms TTL=127
+Reply from 10.20.1.15: bytes=32 time<1ms TTL=127
+Reply from 10.20.1.15: bytes=32 time=2ms TTL=127
+Reply from 10.20.1.15: bytes=32 time<1ms TTL=127
+
+Ping statistics for 10.20.1.15:
+    Packets: Sent = 4, Received = 4, Lost = 0 (0% loss),
+Approximate round trip times in milli-seconds:
+    Minimum = 0ms, Maximum = 2ms, Average = 0ms
+""".replace('\n', '\r\n'),
+	'windows_partial': """
+Pinging 10.20.1.16 with 32 bytes of data:
+Reply from 10.20.1.16: bytes=32 time=14ms TTL=127
+Request timed out.
+Reply from 10.20.1.16: bytes=32 time=9ms TTL=127
+Request timed out.
+
+Ping statistics for 10.20.1.16:
+    Packets: Sent = 4, Received = 2, Lost = 2 (50% loss),
+Approximate round trip times in milli-seconds:
+    Minimum = 9ms, Maximum = 14ms, Average = 11ms
+""".replace('\n', '\r\n'),
+	'windows_no': """
+Pinging 10.20.1.17 with 32 bytes of data:
+Request timed out.
+Request timed out.
+Request timed out.
+Request timed out.
+
+Ping statistics for 10.20.1.17:
+    Packets: Sent = 4, Received = 0, Lost = 4 (100% loss),
+""".replace('\n', '\r\n'),
+	'windows_unreachable': """
+Pinging 10.20.9.1 with 32 bytes of data:
+Reply from 10.20.1.1: Destination host unreachable.
+Reply from 10.20.1.1: Destination host unreachable.
+Reply from 10.20.1.1: Destination host unreachable.
+Reply from 10.20.1.1: Destination host unreachable.
+
+Ping statistics for 10.20.9.1:
+    Packets: Sent = 4, Received = 4, Lost = 0 (0% loss),
+""".replace('\n', '\r\n'),
+	'linux_yes': """PING 10.20.1.15 (10.20.1.15) 56(84) bytes of data.
+64 bytes from 10.20.1.15: icmp_seq=1 ttl=127 time=0.512 ms
+64 bytes from 10.20.1.15: icmp_seq=2 ttl=127 time=0.498 ms
+64 bytes from 10.20.1.15: icmp_seq=3 ttl=127 time=0.731 ms
+64 bytes from 10.20.1.15: icmp_seq=4 ttl=127 time=0.502 ms
+
+--- 10.20.1.15 ping statistics ---
+4 packets transmitted, 4 received, 0% packet loss, time 3004ms
+rtt min/avg/max/mdev = 0.498/0.560/0.731/0.098 ms
+""",
+	'linux_partial': """PING 10.20.1.16 (10.20.1.16) 56(84) bytes of data.
+64 bytes from 10.20.1.16: icmp_seq=1 ttl=127 time=14.2 ms
+64 bytes from 10.20.1.16: icmp_seq=3 ttl=127 time=9.13 ms
+
+--- 10.20.1.16 ping statistics ---
+4 packets transmitted, 2 received, 50% packet loss, time 3021ms
+rtt min/avg/max/mdev = 9.130/11.665/14.200/2.535 ms
+""",
+	'linux_no': """PING 10.20.1.17 (10.20.1.17) 56(84) bytes of data.
+
+--- 10.20.1.17 ping statistics ---
+4 packets transmitted, 0 received, 100% packet loss, time 3070ms
+""",
+	'linux_unreachable': """PING 10.20.9.1 (10.20.9.1) 56(84) bytes of data.
+From 10.20.1.1 icmp_seq=1 Destination Host Unreachable
+From 10.20.1.1 icmp_seq=2 Destination Host Unreachable
+From 10.20.1.1 icmp_seq=3 Destination Host Unreachable
+
+--- 10.20.9.1 ping statistics ---
+4 packets transmitted, 0 received, +3 errors, 100% packet loss, time 3055ms
+""",
+	'cisco_yes': """Type escape sequence to abort.
+Sending 5, 100-byte ICMP Echos to 10.20.1.15, timeout is 2 seconds:
+!!!!!
+Success rate is 100 percent (5/5), round-trip min/avg/max = 1/1/4 ms
+""".replace('\n', '\r\n'),
+	'cisco_partial': """Type escape sequence to abort.
+Sending 5, 100-byte ICMP Echos to 10.20.1.16, timeout is 2 seconds:
+.!!.!
+Success rate is 60 percent (3/5), round-trip min/avg/max = 8/10/14 ms
+""".replace('\n', '\r\n'),
+	'cisco_no': """Type escape sequence to abort.
+Sending 5, 100-byte ICMP Echos to 10.20.1.17, timeout is 2 seconds:
+.....
+Success rate is 0 percent (0/5)
+""".replace('\n', '\r\n'),
+	'cisco_unreachable': """Type escape sequence to abort.
+Sending 5, 100-byte ICMP Echos to 10.20.9.1, timeout is 2 seconds:
+U.U.U
+Success rate is 0 percent (0/5)
+""".replace('\n', '\r\n'),
+}
+
+class FakeProber(object):
+	"""
+	Stands in for a real prober so sweeps can be measured without a network.
+	Every address is given a fixed fate from its IP and the seed: it's either dead, unreachable
+	or alive. Echoes to live hosts are lost at the loss ratio. Replies take latency milliseconds,
+	lost or dead echoes wait out the timeout.
+	"""
+
+	def __init__(self, count = 4, timeout = 0, latency = 0, loss = 0.0, dead = 0.5, unreachable = 0.0, seed = 0):
+		"""
+		Count is echoes per probe, timeout and latency are in milliseconds.
+		Loss, dead and unreachable are ratios between 0 and 1.
+		"""
+
+		self.count = count
+		self.timeout = timeout
+		self.latency = latency
+		self.loss = loss
+		self.dead = dead
+		self.unreachable = unreachable
+		self.seed = seed
+
+	def quick(self, timeout):
+		"""
+		Returns a prober for the same network that sends one echo.
+		"""
+
+		return FakeProber(1, timeout, self.latency, self.loss, self.dead, self.unreachable, self.seed)
+
+	def probe(self, ip):
+		"""
+		Pretends to ping a single IP address and returns a Reply.
+		"""
+
+		fate = random.Random('%s-%s' % (self.seed, ip))
+		roll = fate.random()
+
+		if roll < self.unreachable:
+			self._wait(self.latency)
+			return probe.make_reply(self.count, [], True)
+
+		alive = roll >= self.unreachable + self.dead
+		rtts = []
+
+		for i in range(self.count):
+			if alive and fate.random() >= self.loss:
+				rtt = self.latency * (0.5 + fate.random())
+				rtts.append(rtt)
+				self._wait(rtt)
+			else:
+				self._wait(self.timeout)
+
+		return probe.make_reply(self.count, rtts)
+
+	def _wait(self, milliseconds):
+		"""
+		Sleeps for the given time, if there is any.
+		"""
+
+		if milliseconds:
+			time.sleep(milliseconds / 1000.0)
\ No newline at end of file
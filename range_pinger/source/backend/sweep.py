@@ -0,0 +1,31 @@
+### Python Modules ###
+import collections
+from multiprocessing.pool import ThreadPool
+
+def ordered_map(func, iterable, workers = 1):
+	"""
+	Calls func on every item of iterable with up to workers calls running at once.
+	Yields the results in the same order as iterable, no matter which call finishes first.
+	With one worker (or less) everything is run in the calling thread.
+	"""
+
+	if workers <= 1:
+		for item in iterable:
+			yield func(item)
+		return
+
+	pool = ThreadPool(workers)
+	pending = collections.deque()
+	window = workers * 2 # Keep the threads busy while waiting on a slow address at the front.
+
+	try:
+		for item in iterable:
+			pending.append(pool.apply_async(func, (item,)))
+
+			if len(pending) >= window:
+				yield pending.popleft().get()
+
+		while pending:
+			yield pending.popleft().get()
+	finally:
+		pool.terminate()
\ No newline at end of file
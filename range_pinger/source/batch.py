@@ -0,0 +1,289 @@
+### Python Modules ###
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+
+### User Modules ###
+from backend import neighbors
+from backend import planner
+from backend import rp
+
+### Private Functions ###
+def _parse_target(target):
+	"""
+	Turns a target from the command line into a tuple of (bldg, network).
+	Targets are a building already in the range database, a network in CIDR notation
+	(saved under its own name), or bldg=network.
+	"""
+
+	if '=' in target:
+		return tuple(target.split('=', 1))
+	elif '/' in target:
+		return target.replace('/', '_'), target
+
+	return target, None
+
+def _sweep(job):
+	"""
+	Sweeps and saves a single building. Runs in a worker process.
+	Returns a tuple of (bldg, hosts, seconds, changes, metrics summary, error).
+	"""
+
+	bldg, network, options = job
+	start = time.time()
+
+	try:
+		target = rp.RangePing(network, None, bldg)
+
+		for status in target.ping(options['args'], options['workers'], adaptive = options['adaptive'], resume = options['resume'],
+		                          neighbors = options['neighbors']):
+			pass
+
+		target.save_results(options['overwrite'])
+
+		if options['csv']:
+			target.export_results()
+	except Exception as e: # One building failing mustn't stop the rest.
+		return bldg, 0, time.time() - start, None, None, str(e)
+
+	return bldg, target.length, time.time() - start, target.changes, target.metrics.summary(), None
+
+def _sweep_shard(job):
+	"""
+	Sweeps one shard of a building without saving it. Runs in a worker process.
+	Returns a tuple of (bldg, results, metrics, error).
+	"""
+
+	bldg, network, options, spec = job
+
+	try:
+		target = rp.RangePing(network, None, bldg)
+		shard = planner.parse_spec(target.length, spec)
+
+		for status in target.ping(options['args'], options['workers'], adaptive = options['adaptive'], neighbors = options['neighbors'], shard = shard):
+			pass
+	except Exception as e:
+		return bldg, None, None, str(e)
+
+	return bldg, target.results, target.metrics, None
+
+def _sweep_sharded(pool, targets, options, shards):
+	"""
+	Sweeps every building split into shards across the pool, then puts each building's shards
+	back together and saves them as one sweep. Yields the same tuples as _sweep as each building finishes.
+	"""
+
+	start = time.time()
+	parts = dict((bldg, []) for bldg, network in targets)
+	errors = dict((bldg, []) for bldg, network in targets)
+	jobs = [(bldg, network, options, '%s/%s' % (number, shards)) for bldg, network in targets for number in range(shards)]
+
+	for bldg, results, metrics, error in pool.imap_unordered(_sweep_shard, jobs):
+		if error:
+			errors[bldg].append(error)
+		else:
+			parts[bldg].append((results, metrics))
+
+		if len(parts[bldg]) + len(errors[bldg]) < shards:
+			continue
+
+		seconds = time.time() - start
+		if errors[bldg]:
+			yield bldg, 0, seconds, None, None, errors[bldg][0]
+			continue
+
+		try:
+			target = rp.RangePing(dict(targets)[bldg], None, bldg)
+			planner.merge(target, parts[bldg])
+			target.save_results(options['overwrite'])
+
+			if options['csv']:
+				target.export_results()
+		except Exception as e:
+			yield bldg, 0, seconds, None, None, str(e)
+			continue
+
+		yield bldg, target.length, seconds, target.changes, target.metrics.summary(), None
+
+def _show_hosts(address):
+	"""
+	Prints the saved state of an IP address, or of every host in a network in CIDR notation.
+	"""
+
+	index = rp.open_index()
+
+	if '/' in address:
+		hosts = index.lookup_prefix(address)
+	else:
+		hosts = index.lookup(address)
+
+	for host in hosts:
+		up = time.ctime(host.last_up) if host.last_up else 'never'
+		down = time.ctime(host.last_down) if host.last_down else 'never'
+
+		print '%s (%s): %s - last up %s, last down %s, %s flaps' % (host.ip, host.bldg, host.status or 'not pinged', up, down, host.flaps)
+
+def _show_report(bldg, network, flapping):
+	"""
+	Prints a building's availability, its most flapping hosts and how many hosts were up each day.
+	"""
+
+	try:
+		history = rp.RangePing(network, None, bldg).report()
+	except ValueError as e:
+		print '%s: %s' % (bldg, e)
+		return
+	overall = history.overall()
+
+	if overall is None:
+		print '%s: nothing saved yet' % bldg
+		return
+
+	print '%s: %s sweeps, hosts were up %.1f%% of the time' % (bldg, len(history), overall)
+
+	for ip, flaps in history.flapping(limit = flapping):
+		print '  %s flapped %s times' % (ip, flaps)
+
+	for day in history.daily():
+		print '  %s: %s sweeps, %s hosts up, %.1f up on average' % (day.date, day.sweeps, day.up_any, day.up_avg)
+
+def _compact(bldg, network):
+	"""
+	Moves a building's saved sweeps into its archive.
+	"""
+
+	try:
+		count = rp.RangePing(network, None, bldg).compact()
+	except ValueError as e:
+		print '%s: %s' % (bldg, e)
+		return
+
+	print '%s: %s sweeps archived' % (bldg, count)
+
+def _make_parser():
+	"""
+	Builds the command line parser.
+	"""
+
+	parser = argparse.ArgumentParser(description = "Sweeps buildings without the GUI and saves the results. "
+	                                               "The resources directory is relative to where this is run from.")
+
+	parser.add_argument('targets', nargs = '*', help = "Buildings in the range database, networks in CIDR notation, or bldg=network.")
+	parser.add_argument('--lookup', metavar = 'ADDRESS', help = "Show what's known about an IP (or every IP in a CIDR network) instead of sweeping.")
+	parser.add_argument('--report', action = 'store_true', help = "Report on the saved history of each building instead of sweeping.")
+	parser.add_argument('--compact', action = 'store_true', help = "Move each building's saved sweeps into its compressed archive instead of sweeping.")
+	parser.add_argument('--flapping', type = int, default = 10, help = "Most flapping hosts to list in a report.")
+	parser.add_argument('--all', action = 'store_true', help = "Sweep every building in the range database.")
+	parser.add_argument('--count', type = int, default = 4, help = "Pings to send to each address.")
+	parser.add_argument('--timeout', type = int, default = 2000, help = "Milliseconds to wait for each reply.")
+	parser.add_argument('--workers', type = int, default = 32, help = "Pings running at once in each process.")
+	parser.add_argument('--shards', type = int, default = 1, help = "Split each building into this many interleaved shards swept side by side. Shards aren't checkpointed.")
+	parser.add_argument('--processes', type = int, default = multiprocessing.cpu_count(), help = "Buildings swept at once.")
+	parser.add_argument('--adaptive', action = 'store_true', help = "Ping everything once quickly and only do the full count on what answers.")
+	parser.add_argument('--neighbors', metavar = 'FILE', nargs = '?', const = '', help = "Mark hosts in the ARP table as up without pinging them. "
+	                                                                                     "Reads this machine's table, or show ip arp saved from a switch in FILE.")
+	parser.add_argument('--resume', action = 'store_true', help = "Pick up interrupted sweeps where they left off.")
+	parser.add_argument('--overwrite', action = 'store_true', help = "Start each building's history over.")
+	parser.add_argument('--csv', action = 'store_true', help = "Export each building's history to its CSV file afterwards.")
+
+	return parser
+
+### Public Functions ###
+def run(argv = None):
+	"""
+	Sweeps the buildings given on the command line across a pool of processes,
+	printing how long each one took. Returns the exit status.
+	"""
+
+	parser = _make_parser()
+	options = parser.parse_args(argv)
+
+	if options.lookup:
+		try:
+			_show_hosts(options.lookup)
+		except ValueError as e:
+			parser.error(str(e))
+		return 0
+
+	targets = [_parse_target(t) for t in options.targets]
+	if options.all:
+		targets += [(bldg, None) for bldg in sorted(rp.open_db())]
+
+	if not targets:
+		parser.error("Give some buildings or networks to sweep, or --all.")
+
+	if options.report:
+		for bldg, network in targets:
+			_show_report(bldg, network, options.flapping)
+		return 0
+
+	if options.compact:
+		for bldg, network in targets:
+			_compact(bldg, network)
+		return 0
+
+	if os.name == 'nt':
+		args = '-n %s -w %s' % (options.count, options.timeout)
+	else:
+		args = '-c %s -W %s' % (options.count, max(1, options.timeout // 1000))
+
+	known = None
+	if options.neighbors is not None:
+		try:
+			known = neighbors.load(options.neighbors)
+		except (IOError, OSError) as e: # Missing or unreadable file, or no arp to run.
+			parser.error("Couldn't read the neighbor table: %s" % e)
+		print '%s hosts known from the ARP table.' % len(known)
+
+	settings = {'args': args,
+	            'workers': options.workers,
+	            'adaptive': options.adaptive,
+	            'resume': options.resume,
+	            'neighbors': known,
+	            'overwrite': options.overwrite,
+	            'csv': options.csv}
+
+	if not os.path.isdir(rp.RESOURCE):
+		os.mkdir(rp.RESOURCE)
+
+	rp.open_db() # Creates the database (or moves an old one over) before the workers race to do it.
+
+	if options.shards > 1:
+		for bldg, network in targets: # Saves new ranges before the shards race to do it.
+			try:
+				rp.RangePing(network, None, bldg)
+			except Exception:
+				pass # The shards report it.
+
+		pool = multiprocessing.Pool(max(1, min(options.processes, len(targets) * options.shards)))
+		sweeps = _sweep_sharded(pool, targets, settings, options.shards)
+	else:
+		pool = multiprocessing.Pool(max(1, min(options.processes, len(targets))))
+		sweeps = pool.imap_unordered(_sweep, [(b, n, settings) for b, n in targets])
+
+	failed = 0
+	start = time.time()
+
+	try:
+		for bldg, hosts, seconds, changes, summary, error in sweeps:
+			if error:
+				failed += 1
+				print '%s: failed after %.1f seconds - %s' % (bldg, seconds, error)
+				continue
+
+			line = '%s: %s hosts in %.1f seconds (%.0f hosts/second)' % (bldg, hosts, seconds, hosts / max(seconds, 0.001))
+			if changes:
+				line += ', %s up and %s down since the last sweep' % (len(changes.up), len(changes.down))
+			if summary.answered:
+				line += ', %.1f ms average round trip' % summary.rtt_avg
+
+			print line
+			sys.stdout.flush()
+	finally:
+		pool.terminate()
+
+	print '%s buildings in %.1f seconds, %s failed.' % (len(targets), time.time() - start, failed)
+
+	return 1 if failed else 0
\ No newline at end of file
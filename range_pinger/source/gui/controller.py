@@ -1,14 +1,20 @@
 ### Python Modules ###
 from Tkinter import *
 from ttk import *
+from Queue import Empty
 
 ### User Modules
+from ..backend import neighbors
 from ..backend.rp import RangePing
+from ..backend.scheduler import SweepScheduler
 from input_frame import Input
 from results_frame import Result
 from messages_dialog import Message
 # from messages_dialog import Message
 
+### Globals ###
+POLL = 50 # Milliseconds between checking the sweep for results.
+
 class Gui(Frame):
 	"""
 	The controller class for the Rangepinger GUI. Handles connecting the backend to the frontend.
@@ -29,8 +35,14 @@ class Gui(Frame):
 		self.input_frame = Input(self)
 		self.input_frame.pack()
 		
-		button_ok = Button(self, text = "Ping", command = self._go)
-		button_ok.pack()
+		self.button_ok = Button(self, text = "Ping", command = self._go)
+		self.button_ok.pack()
+		
+		self.button_pause = Button(self, text = "Pause", command = self._pause, state = DISABLED)
+		self.button_pause.pack()
+		
+		self.button_cancel = Button(self, text = "Cancel", command = self._cancel, state = DISABLED)
+		self.button_cancel.pack()
 		
 		self.result_frame = Result(self)
 		self.result_frame.pack()
@@ -38,24 +50,107 @@ class Gui(Frame):
 	def _go(self):
 		"""
 		When clicked, gets the options for the input frame
-		and then feeds the results to the result frame.
+		and then starts a sweep that feeds the results to the result frame.
 		"""
 		self.result_frame.clear()
 		
-		options = self.input_frame.get_values()
+		self.options = self.input_frame.get_values()
 		
 		try:
-			range = RangePing(options['ip'], options['subnet'], options['building'])
-			self.result_frame.set_max(range.length)
+			self.range = RangePing(self.options['ip'], self.options['subnet'], self.options['building'])
+			self.result_frame.set_max(self.range.length)
+			
+			known = None
+			if self.options['neighbors'] == 1:
+				known = neighbors.load()
+				
+			self.sweep = SweepScheduler(int(self.options['workers']))
+			self.sweep.add(self.range, self.options['args'], adaptive = self.options['adaptive'] == 1, resume = self.options['resume'] == 1, neighbors = known)
+			self.sweep.start()
+		except ValueError as e:
+			Message('error', e.message)
+			return
+		except (IOError, OSError) as e: # Couldn't read the ARP table.
+			Message('error', str(e))
+			return
+			
+		self._set_running(True)
+		self._poll()
 		
-			for ip in range.ping(options['args']):
+	def _poll(self):
+		"""
+		Moves the progress bar for every result the sweep has finished since the last poll.
+		Checks back every POLL milliseconds until the sweep is done, so the window stays responsive.
+		"""
+		
+		try:
+			while True:
+				self.sweep.get(False)
 				self.result_frame.make_step()
-				self.parent.update_idletasks()
-				
-			if options['save'] == 1:
-				range.save_results(options['overwrite'] == 1)
+		except Empty:
+			pass
+		except Exception as e: # A probe blew up. Stop rather than leave the button disabled forever.
+			self.sweep.close()
+			self._set_running(False)
+			Message('error', str(e))
+			return
 			
-			Message('info', range.get_summary())
+		if self.sweep.done:
+			self._finish()
+		else:
+			self.after(POLL, self._poll)
+			
+	def _pause(self):
+		"""
+		Pauses the sweep, or resumes it if it's already paused.
+		"""
+		
+		if self.sweep.paused:
+			self.sweep.resume()
+			self.button_pause.configure(text = "Pause")
+		else:
+			self.sweep.pause()
+			self.button_pause.configure(text = "Resume")
+			
+	def _cancel(self):
+		"""
+		Cancels the sweep. Whatever was pinged before cancelling is still saved.
+		"""
+		
+		self.sweep.cancel()
+		self.button_pause.configure(state = DISABLED)
+		self.button_cancel.configure(state = DISABLED)
+		
+	def _set_running(self, running):
+		"""
+		Enables the buttons that make sense while a sweep is or isn't running.
+		"""
+		
+		if running:
+			self.button_ok.configure(state = DISABLED)
+			self.button_pause.configure(state = NORMAL, text = "Pause")
+			self.button_cancel.configure(state = NORMAL)
+		else:
+			self.button_ok.configure(state = NORMAL)
+			self.button_pause.configure(state = DISABLED, text = "Pause")
+			self.button_cancel.configure(state = DISABLED)
+			
+	def _finish(self):
+		"""
+		Saves and shows the results once the sweep is done, even if it was cancelled part way.
+		"""
+		
+		self.sweep.close()
+		self._set_running(False)
+		
+		try:
+			if self.options['save'] == 1 and self.range.results: # Nothing to save if it was cancelled before any result.
+				self.range.save_results(self.options['overwrite'] == 1)
+				
+				if self.options['export'] == 1:
+					self.range.export_results()
+				
+			Message('info', self.range.get_summary())
 		except ValueError as e:
 			Message('error', e.message)
 
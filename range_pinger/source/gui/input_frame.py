@@ -13,10 +13,15 @@ class Input(Frame):
 		self.bldg = StringVar()
 		self.count = StringVar()
 		self.time = StringVar()
+		self.workers = StringVar()
 		self.ip = StringVar()
 		self.subnet = StringVar()
 		self.save = IntVar()
 		self.overwrite = IntVar()
+		self.export = IntVar()
+		self.adaptive = IntVar()
+		self.resume = IntVar()
+		self.neighbors = IntVar()
 		
 		self._set_defaults()
 		self._init_ui()
@@ -29,7 +34,9 @@ class Input(Frame):
 		
 		self.count.set("4")
 		self.time.set("2000")
+		self.workers.set("32")
 		self.save.set(1)
+		self.resume.set(1)
 		
 	def _init_ui(self):
 		"""
@@ -39,21 +46,31 @@ class Input(Frame):
 		bldg_entry = self._create_input_box('Bldg', self.bldg)
 		count_entry = self._create_input_box("Count", self.count)
 		time_entry = self._create_input_box("Time (Milliseconds)", self.time)
+		workers_entry = self._create_input_box("Workers", self.workers)
 		ip_entry = self._create_input_box("IP", self.ip)
 		subnet_entry = self._create_input_box("Subnet", self.subnet)
 		
 		save_checkbox = Checkbutton(self, text = "Save", variable = self.save)
 		overwrite_checkbox = Checkbutton(self, text = "Overwrite", variable = self.overwrite)
+		export_checkbox = Checkbutton(self, text = "Export CSV", variable = self.export)
+		adaptive_checkbox = Checkbutton(self, text = "Quick check first", variable = self.adaptive)
+		resume_checkbox = Checkbutton(self, text = "Resume", variable = self.resume)
+		neighbors_checkbox = Checkbutton(self, text = "Trust ARP table", variable = self.neighbors)
 		
 		bldg_entry.grid(row = 0, column = 0)
 		count_entry.grid(row = 0, column = 2)
 		time_entry.grid(row = 0, column = 4)
+		workers_entry.grid(row = 0, column = 6)
 		
 		ip_entry.grid(row = 1, column = 0, columnspan = 2)
 		subnet_entry.grid(row = 1, column = 3, columnspan = 2)
 		
 		save_checkbox.grid(row = 2, column = 0, columnspan = 2)
 		overwrite_checkbox.grid(row = 2, column = 3, columnspan = 2)		
+		export_checkbox.grid(row = 2, column = 6)
+		adaptive_checkbox.grid(row = 1, column = 6)
+		resume_checkbox.grid(row = 1, column = 7)
+		neighbors_checkbox.grid(row = 2, column = 7)
 		
 	def _create_input_box(self, label, variable, **kwargs):
 		"""
@@ -78,6 +95,11 @@ class Input(Frame):
 		Ip - Either the IP/CIDR or the IP and subnet.
 		Save - Whether or not to save the results. Defaults to save.
 		Overwrite - Overwrite an existing file with the current results. Defaults to no.
+		Workers - How many pings to run at once.
+		Export - Write the building's history out to its CSV file after saving, which rewrites the whole file. Defaults to no.
+		Adaptive - Ping everything once quickly and only do the full count on what answers. Defaults to no.
+		Resume - Pick up an interrupted sweep of the building where it left off. Defaults to resume.
+		Neighbors - Mark the hosts in this machine's ARP table as up without pinging them. Defaults to no.
 		"""
 		
 		results_dic = {'args': "-n %s -w %s" % (self.count.get(), self.time.get()),
@@ -85,6 +107,11 @@ class Input(Frame):
 							 'ip': '%s' % self.ip.get(),
 							 'subnet': '%s' % self.subnet.get(),
 							 'save': self.save.get(),
-							 'overwrite': self.overwrite.get()}
+							 'overwrite': self.overwrite.get(),
+							 'export': self.export.get(),
+							 'adaptive': self.adaptive.get(),
+							 'resume': self.resume.get(),
+							 'neighbors': self.neighbors.get(),
+							 'workers': self.workers.get()}
 							 
 		return results_dic
\ No newline at end of file